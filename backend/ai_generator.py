@@ -1,14 +1,416 @@
-from openai import OpenAI
-from typing import List, Optional, Dict, Any, Union, Callable
-import json
+from openai import AsyncOpenAI, DefaultAsyncHttpxClient
+import httpx
+from pydantic import BaseModel
+from typing import List, Optional, Dict, Any, Union, Callable, Final, AsyncIterator
+import orjson
+import sys
+import asyncio
+import contextvars
+import threading
+import re
 from enum import Enum
 from dataclasses import dataclass, field
 import time
+import heapq
 import logging
 from abc import ABC, abstractmethod
+from contextlib import nullcontext
+from types import SimpleNamespace
+from token_budget import truncate_to_tokens
+
+# Stable key so OpenAI routes requests sharing the static system prompt to a warm prompt cache
+PROMPT_CACHE_KEY = "course-materials-sequential"
+
+# Connection pool for OpenAI traffic, sized for concurrent sessions each fanning out
+# tool rounds; over HTTP/2 concurrent completions share one TLS connection
+OPENAI_HTTP_LIMITS = httpx.Limits(max_connections=100, max_keepalive_connections=50)
+OPENAI_HTTP_TIMEOUT = httpx.Timeout(60.0, connect=5.0)
+
+def _build_async_client(api_key: str) -> AsyncOpenAI:
+    """AsyncOpenAI client on a pooled HTTP/2 transport, keeping the SDK's other httpx defaults"""
+    http_client = DefaultAsyncHttpxClient(http2=True, limits=OPENAI_HTTP_LIMITS, timeout=OPENAI_HTTP_TIMEOUT)
+    return AsyncOpenAI(api_key=api_key, http_client=http_client)
+
+def _keyword_pattern(keywords: List[str]) -> re.Pattern:
+    """Compile keywords into one alternation matching any of them as a plain substring"""
+    return re.compile("|".join(re.escape(kw) for kw in keywords))
+
+# uvloop schedules coroutines faster than the stock loop; it is not available on Windows
+try:
+    import uvloop
+    _new_event_loop = uvloop.new_event_loop
+except ImportError:
+    _new_event_loop = asyncio.new_event_loop
+
+# Background event loop that runs async processing for synchronous callers
+_sync_loop: Optional[asyncio.AbstractEventLoop] = None
+_sync_loop_lock = threading.Lock()
+
+def _run_sync(coro):
+    """
+    Run a coroutine to completion from synchronous code. A single long-lived loop
+    is shared so the async client's connection pool is never bound to a closed
+    loop, and this works whether or not the caller already runs an event loop.
+    """
+    global _sync_loop
+    with _sync_loop_lock:
+        if _sync_loop is None:
+            _sync_loop = _new_event_loop()
+            threading.Thread(target=_sync_loop.run_forever, name="ai-generator-loop", daemon=True).start()
+    # Carry the caller's context variables, such as an open source collection, onto the loop
+    return asyncio.run_coroutine_threadsafe(_in_context(contextvars.copy_context(), coro), _sync_loop).result()
+
+async def _in_context(context: contextvars.Context, coro):
+    """Await coro with the variables of context set in the running task"""
+    for var, value in context.items():
+        var.set(value)
+    return await coro
+
+# Micro-batching window for plain completions arriving in a burst
+BATCH_MAX_SIZE = 8
+BATCH_MAX_WAIT = 0.015
+
+class _BatchLane:
+    """One event loop's request queue, the worker draining it, and its requests in flight"""
+    
+    __slots__ = ("queue", "worker", "pending", "bursts")
+    
+    def __init__(self):
+        self.queue: asyncio.Queue = asyncio.Queue()
+        self.worker: Optional[asyncio.Task] = None
+        # Submitted requests not yet answered, whether queued or dispatched
+        self.pending = 0
+        # Strong references so dispatched bursts are not garbage collected mid-flight
+        self.bursts: set = set()
+
+class _BatchingCompleter:
+    """
+    Coalesces chat completions submitted within max_wait seconds of each other
+    and issues them as one burst of concurrent requests. The chat API has no
+    true batching, but a burst shares the pooled HTTP/2 connection instead of
+    each request being dispatched on its own schedule.
+    
+    Every event loop that submits gets its own lane (queue and worker), so
+    requests never cross loops, including _run_sync's loop thread. A request
+    arriving while no other is in flight is dispatched at once instead of
+    waiting out the window.
+    """
+    
+    __slots__ = ("client", "max_batch", "max_wait", "_lanes", "_lanes_lock")
+    
+    def __init__(self, client: AsyncOpenAI, max_batch: int = BATCH_MAX_SIZE, max_wait: float = BATCH_MAX_WAIT):
+        self.client = client
+        self.max_batch = max_batch
+        self.max_wait = max_wait
+        self._lanes: Dict[asyncio.AbstractEventLoop, _BatchLane] = {}
+        self._lanes_lock = threading.Lock()
+    
+    async def submit(self, params: Dict[str, Any]):
+        """Queue one completion request and wait for its response"""
+        loop = asyncio.get_running_loop()
+        lane = self._lane(loop)
+        
+        future = loop.create_future()
+        lane.pending += 1
+        try:
+            lane.queue.put_nowait((params, future))
+            return await future
+        finally:
+            lane.pending -= 1
+    
+    def _lane(self, loop: asyncio.AbstractEventLoop) -> _BatchLane:
+        """The running loop's lane, started on its first submit"""
+        with self._lanes_lock:
+            lane = self._lanes.get(loop)
+            if lane is None or lane.worker.done():
+                # Forget lanes of loops that have closed since
+                for closed in [other for other in self._lanes if other.is_closed()]:
+                    del self._lanes[closed]
+                lane = _BatchLane()
+                lane.worker = loop.create_task(self._collect(lane))
+                self._lanes[loop] = lane
+            return lane
+    
+    async def _collect(self, lane: _BatchLane):
+        """Gather a lane's requests into bursts of up to max_batch and dispatch each without waiting on it"""
+        loop = asyncio.get_running_loop()
+        queue = lane.queue
+        while True:
+            batch = [await queue.get()]
+            # Only wait for company when other requests are in flight to send it
+            if lane.pending > 1:
+                deadline = loop.time() + self.max_wait
+                while len(batch) < self.max_batch:
+                    remaining = deadline - loop.time()
+                    if remaining <= 0:
+                        break
+                    try:
+                        batch.append(await asyncio.wait_for(queue.get(), remaining))
+                    except asyncio.TimeoutError:
+                        break
+            
+            burst = loop.create_task(self._dispatch(batch))
+            lane.bursts.add(burst)
+            burst.add_done_callback(lane.bursts.discard)
+    
+    async def _dispatch(self, batch: List[tuple]):
+        """Issue a burst concurrently, resolving each caller's future with its own outcome"""
+        await asyncio.gather(*(self._complete(params, future) for params, future in batch))
+    
+    async def _complete(self, params: Dict[str, Any], future: asyncio.Future):
+        """Run one completion unless its caller has already given up on it"""
+        if future.done():
+            return
+        try:
+            response = await self.client.chat.completions.create(**params)
+        except Exception as e:
+            if not future.done():
+                future.set_exception(e)
+            return
+        if not future.done():
+            future.set_result(response)
+
+def _parse_tool_arguments(args_str: Optional[str]) -> Dict[str, Any]:
+    """Parse tool call arguments, skipping the parser for the common empty cases"""
+    if not args_str or args_str == "{}":
+        return {}
+    try:
+        return orjson.loads(args_str)
+    except orjson.JSONDecodeError:
+        return {}
+
+# Longest tool output passed back to the model, in tokens so the prompt budget
+# holds for any script (English averages ~4 chars per token, CJK and code far fewer)
+MAX_TOOL_RESULT_TOKENS = 1500
+
+def _execute_tool_bounded(tool_manager, tool_name: str, tool_args: Dict[str, Any]) -> str:
+    """
+    Run a tool with its output capped at MAX_TOOL_RESULT_TOKENS. Managers that
+    provide execute_tool_bounded cap the output themselves; anything exposing only
+    execute_tool (including test doubles) is truncated here, without rebuilding
+    results that already fit.
+    """
+    if callable(getattr(type(tool_manager), "execute_tool_bounded", None)):
+        return tool_manager.execute_tool_bounded(tool_name, max_tokens=MAX_TOOL_RESULT_TOKENS, **tool_args)
+    
+    return truncate_to_tokens(tool_manager.execute_tool(tool_name, **tool_args), MAX_TOOL_RESULT_TOKENS)
+
+def _run_tool_call(tool_call, tool_manager) -> tuple:
+    """
+    Execute a single tool call, returning (arguments, truncated result, succeeded).
+    Failures become an error string so one bad call never sinks a batch.
+    """
+    tool_args = _parse_tool_arguments(tool_call.function.arguments)
+    
+    try:
+        return tool_args, _execute_tool_bounded(tool_manager, tool_call.function.name, tool_args), True
+    except Exception as e:
+        return tool_args, f"Error executing tool: {str(e)}", False
+
+# Upper bound on tool calls from one model turn that execute at once
+TOOL_CONCURRENCY_LIMIT = 4
+
+async def _arun_tool_call(tool_call, tool_manager, limit: asyncio.Semaphore) -> tuple:
+    """Run one tool call in a worker thread while holding a slot of the concurrency limit"""
+    async with limit:
+        return await asyncio.to_thread(_run_tool_call, tool_call, tool_manager)
+
+async def _arun_tool_calls(tool_calls, tool_manager) -> List[tuple]:
+    """Run a turn's tool calls concurrently, returning outcomes in call order"""
+    limit = asyncio.Semaphore(TOOL_CONCURRENCY_LIMIT)
+    return list(await asyncio.gather(*(_arun_tool_call(tc, tool_manager, limit) for tc in tool_calls)))
+
+async def _with_own_sources(coro, tool_manager) -> tuple:
+    """
+    Await coro inside its own source collection, returning (result, sources found).
+    Run as a task, tool calls it starts record only there, even ones still running
+    in a worker thread after the task is cancelled. Managers without
+    collect_sources (including test doubles) get a throwaway list.
+    """
+    if callable(getattr(type(tool_manager), "collect_sources", None)):
+        collection = tool_manager.collect_sources()
+    else:
+        collection = nullcontext([])
+    with collection as sources:
+        result = await coro
+    return result, sources
+
+def _merge_tool_call_delta(calls: Dict[int, Dict[str, Any]], tc) -> None:
+    """Fold one streamed tool-call delta into the calls accumulated so far, keyed by index"""
+    if tc.index not in calls:
+        calls[tc.index] = {"id": tc.id, "type": tc.type or "function", "name": "", "arguments": []}
+    call = calls[tc.index]
+    if tc.id:
+        call["id"] = tc.id
+    if tc.function:
+        if tc.function.name:
+            call["name"] += tc.function.name
+        if tc.function.arguments:
+            call["arguments"].append(tc.function.arguments)
+
+# Assistant message fields the API accepts back as input; response-only fields
+# such as annotations are left out
+_ASSISTANT_INPUT_FIELDS = frozenset({"role", "content", "refusal", "tool_calls"})
+
+def _assistant_message(message) -> Dict[str, Any]:
+    """
+    Turn an assistant message with tool calls into a request message. SDK
+    messages go through pydantic's compiled serializer; anything else, such as a
+    message rebuilt from streamed deltas, is assembled field by field.
+    """
+    if isinstance(message, BaseModel):
+        return message.model_dump(include=_ASSISTANT_INPUT_FIELDS, exclude_none=True)
+    return {
+        "role": "assistant",
+        "content": message.content or "",
+        "tool_calls": [
+            {
+                "id": tc.id,
+                "type": tc.type,
+                "function": {
+                    "name": tc.function.name,
+                    "arguments": tc.function.arguments
+                }
+            } for tc in message.tool_calls
+        ]
+    }
+
+def _as_tool_call(call: Dict[str, Any]):
+    """Build a tool call object matching the SDK's attribute layout from accumulated deltas"""
+    return SimpleNamespace(
+        id=call["id"],
+        type=call["type"],
+        function=SimpleNamespace(name=call["name"], arguments="".join(call["arguments"]))
+    )
+
+# Bounds on the final-synthesis prompt: recent tool-round messages kept after
+# the conversation preamble, and characters kept from stale tool outputs
+MAX_CONTEXT_MESSAGES = 12
+ELIDED_TOOL_OUTPUT_CHARS = 300
+
+# Size of the bottom-k MinHash signature kept per tool result
+SIGNATURE_SIZE = 128
+
+def _shingle_signature(text_lower: str) -> frozenset:
+    """Hash the distinct words and keep the smallest SIGNATURE_SIZE as a bottom-k MinHash signature"""
+    return frozenset(heapq.nsmallest(SIGNATURE_SIZE, {hash(token) for token in text_lower.split()}))
+
+def _estimate_jaccard(a: frozenset, b: frozenset) -> float:
+    """
+    Bottom-k estimate of the Jaccard similarity of two texts from their signatures.
+    A full signature holds every hash of its text up to its largest, so the union's
+    hashes under the lower such cutoff are a uniform sample of the union; the
+    estimate is the share of that sample found in both. Signatures that were
+    never cut off compare exactly.
+    """
+    cutoff = min((max(sig) for sig in (a, b) if len(sig) == SIGNATURE_SIZE), default=None)
+    union = a | b
+    sample = union if cutoff is None else {h for h in union if h <= cutoff}
+    if not sample:
+        return 0.0
+    return len(sample & a & b) / len(sample)
+
+# Intent keyword groups, compiled once so classification scans the query once per group in C
+_COMPARISON_PATTERN = _keyword_pattern(['compare', 'difference', 'vs', 'versus', 'between'])
+_OUTLINE_PATTERN = _keyword_pattern(['outline', 'structure', 'overview', 'table of contents', 'lessons'])
+_CONTENT_PATTERN = _keyword_pattern(['lesson', 'chapter', 'section', 'how to', 'what is', 'explain'])
+_COURSE_PATTERN = _keyword_pattern(['course', 'mcp', 'tutorial'])
+_MULTI_STEP_PATTERN = _keyword_pattern(['then', 'after that', 'next', 'also show', 'and then'])
+
+# Queries shorter than this, with no reasoning keywords, are routed to the small model
+SMALL_MODEL_MAX_WORDS = 20
+_COMPLEX_QUERY_PATTERN = _keyword_pattern(['compare', 'explain', 'why', 'step'])
+
+def _route_to_small_model(query: str, conversation_history: Optional[List[Dict[str, str]]], tools_needed: bool) -> bool:
+    """Short standalone queries needing neither tools nor multi-step reasoning suit the small model"""
+    return (
+        not tools_needed
+        and not conversation_history
+        and len(query.split()) < SMALL_MODEL_MAX_WORDS
+        and not _COMPLEX_QUERY_PATTERN.search(query.lower())
+    )
 
 # Core classes for state-machine based sequential processing
 
+# System prompts are interned once at import so every request reuses the same
+# string object and sends a byte-identical, cacheable prefix
+SEQUENTIAL_SYSTEM_PROMPT: Final[str] = sys.intern("""You are an AI assistant specialized in course materials and educational content with access to comprehensive tools for course information.
+
+Available Tools:
+1. **search_course_content**: For searching specific course content and detailed educational materials
+2. **get_course_outline**: For retrieving course outlines with title, course link, and complete lesson lists
+
+Sequential Tool Usage:
+- You can make tool calls across multiple rounds of reasoning (max 2 rounds)
+- Round 1: Make initial tool calls to gather information
+- Round 2: If needed, make additional tool calls based on Round 1 results to complete your understanding
+- Build upon previous tool results to provide comprehensive answers
+- Examples requiring multiple rounds:
+  * Comparing content from different lessons or courses
+  * Getting course outline then searching for specific lesson content
+  * Searching for related topics across multiple courses
+
+Tool Usage Guidelines:
+- Use **search_course_content** for questions about specific course content or detailed educational materials
+- Use **get_course_outline** for questions about course structure, lesson lists, or when users want to see what's covered in a course
+- Synthesize tool results into accurate, fact-based responses
+- If tools yield no results, state this clearly without offering alternatives
+
+Response Protocol:
+- **General knowledge questions**: Answer using existing knowledge without using tools
+- **Course-specific content questions**: Use search_course_content tool first, then answer
+- **Course outline/structure questions**: Use get_course_outline tool first, then answer
+- **Complex queries**: Use multiple rounds as needed to gather complete information
+- **No meta-commentary**:
+  - Provide direct answers only — no reasoning process, tool explanations, or question-type analysis
+  - Do not mention "based on the search results" or "based on the outline"
+
+For outline queries, always include:
+- Course title
+- Course link
+- Complete lesson list with lesson numbers and titles
+
+All responses must be:
+1. **Brief, Concise and focused** - Get to the point quickly
+2. **Educational** - Maintain instructional value
+3. **Clear** - Use accessible language
+4. **Example-supported** - Include relevant examples when they aid understanding
+Provide only the direct answer to what was asked.""")
+
+LEGACY_SYSTEM_PROMPT: Final[str] = sys.intern(""" You are an AI assistant specialized in course materials and educational content with access to comprehensive tools for course information.
+
+Available Tools:
+1. **search_course_content**: For searching specific course content and detailed educational materials
+2. **get_course_outline**: For retrieving course outlines with title, course link, and complete lesson lists
+
+Tool Usage Guidelines:
+- Use **search_course_content** for questions about specific course content or detailed educational materials
+- Use **get_course_outline** for questions about course structure, lesson lists, or when users want to see what's covered in a course
+- **One tool call per query maximum**
+- Synthesize tool results into accurate, fact-based responses
+- If tools yield no results, state this clearly without offering alternatives
+
+Response Protocol:
+- **General knowledge questions**: Answer using existing knowledge without using tools
+- **Course-specific content questions**: Use search_course_content tool first, then answer
+- **Course outline/structure questions**: Use get_course_outline tool first, then answer
+- **No meta-commentary**:
+ - Provide direct answers only — no reasoning process, tool explanations, or question-type analysis
+ - Do not mention "based on the search results" or "based on the outline"
+
+For outline queries, always include:
+- Course title
+- Course link
+- Complete lesson list with lesson numbers and titles
+
+All responses must be:
+1. **Brief, Concise and focused** - Get to the point quickly
+2. **Educational** - Maintain instructional value
+3. **Clear** - Use accessible language
+4. **Example-supported** - Include relevant examples when they aid understanding
+Provide only the direct answer to what was asked.
+""")
+
 class ConversationState(Enum):
     """States in the conversation processing state machine"""
     INITIAL = "initial"
@@ -26,7 +428,14 @@ class QueryIntent(Enum):
     MULTI_STEP = "multi_step"
     UNKNOWN = "unknown"
 
-@dataclass
+# Intents a single tool round normally answers, raced against sequential
+# processing when AIGenerator.speculative is set
+SPECULATIVE_INTENTS = frozenset({QueryIntent.OUTLINE_REQUEST})
+
+# Answer returned when processing ends without any assistant content
+FALLBACK_RESPONSE: Final[str] = "Unable to generate response"
+
+@dataclass(slots=True)
 class ProcessingResult:
     """Result of processing a query"""
     content: str
@@ -36,7 +445,7 @@ class ProcessingResult:
     semantic_context: Dict[str, Any] = field(default_factory=dict)
     error_recovery_attempts: int = 0
 
-@dataclass
+@dataclass(slots=True)
 class ConversationContext:
     """Rich conversation state across rounds"""
     query: str
@@ -44,12 +453,27 @@ class ConversationContext:
     max_rounds: int = 2
     state: ConversationState = ConversationState.INITIAL
     intent: QueryIntent = QueryIntent.UNKNOWN
-    messages: List[Dict[str, Any]] = field(default_factory=list)
+    messages: List[Dict[str, Any]] = field(default_factory=list)  # Append-only across rounds
     tool_execution_history: List[Dict[str, Any]] = field(default_factory=list)
     semantic_context: Dict[str, Any] = field(default_factory=dict)
     error_recovery_attempts: int = 0
     start_time: float = field(default_factory=time.time)
     all_tools: List[Dict[str, Any]] = field(default_factory=list)
+    model_params: Dict[str, Any] = field(default_factory=dict)  # Base API parameters for this query's rounds
+    
+    # Memoized get_previous_tool_results, valid while the history length is unchanged
+    _previous_results: Optional[List[Dict[str, Any]]] = field(default=None, init=False, repr=False)
+    _previous_results_len: int = field(default=-1, init=False, repr=False)
+    # Name -> tool schema, built once so round filtering is a dict lookup
+    _tool_by_name: Dict[str, Dict[str, Any]] = field(default_factory=dict, init=False, repr=False)
+    
+    def __post_init__(self):
+        self._tool_by_name = {t['function']['name']: t for t in self.all_tools}
+    
+    def tool_named(self, name: str) -> List[Dict[str, Any]]:
+        """Return the named tool as a one-element list, or an empty list if unavailable"""
+        tool = self._tool_by_name.get(name)
+        return [tool] if tool is not None else []
     
     def is_complete(self) -> bool:
         """Check if conversation should be considered complete"""
@@ -59,16 +483,34 @@ class ConversationContext:
             self.state == ConversationState.ERROR_RECOVERY and self.error_recovery_attempts > 2
         )
     
+    def record_tool_execution(self, tool_name: str, arguments: Dict[str, Any], result: str,
+                              tool_call_id: Optional[str] = None):
+        """Append a tool execution to history along with precomputed result stats"""
+        result_lower = result.lower()
+        self.tool_execution_history.append({
+            "round": self.round,
+            "tool_call_id": tool_call_id,
+            "tool_name": tool_name,
+            "arguments": arguments,
+            "result": result,
+            "seq": len(self.tool_execution_history),  # Call order; no clock read needed
+            "_result_len": len(result),
+            "_stripped_len": len(result.strip()),
+            "_no_results": 'no results' in result_lower,
+            "_signature": _shingle_signature(result_lower)
+        })
+    
     def get_previous_tool_results(self) -> List[Dict[str, Any]]:
         """Get all tool results from previous rounds"""
-        return [entry for entry in self.tool_execution_history if entry.get('result')]
+        # History is append-only, so its length identifies the cached snapshot
+        if self._previous_results_len != len(self.tool_execution_history):
+            self._previous_results = [entry for entry in self.tool_execution_history if entry.get('result')]
+            self._previous_results_len = len(self.tool_execution_history)
+        return self._previous_results
     
     def has_relevant_content(self) -> bool:
         """Check if we have found relevant content for the query"""
-        for result in self.get_previous_tool_results():
-            if result.get('result') and 'no results' not in result['result'].lower():
-                return True
-        return False
+        return any(not result['_no_results'] for result in self.get_previous_tool_results())
     
     def has_complete_outline(self) -> bool:
         """Check if we have a complete course outline"""
@@ -89,13 +531,19 @@ class ConversationContext:
 class AdaptiveToolPolicy:
     """Manages tool availability based on conversation context"""
     
+    __slots__ = ()  # Stateless; no per-instance __dict__
+    
     def determine_available_tools(self, context: ConversationContext) -> List[Dict]:
         """Dynamically filter tools based on context and previous results"""
+        # General knowledge keeps its tools on offer: the keyword classifier also
+        # lands here for course topics it has no word for, and the system prompt
+        # already steers true general questions away from the tools
         if not context.all_tools:
             return []
             
         available_tools = []
         previous_results = context.get_previous_tool_results()
+        used_tools = {r.get('tool_name') for r in previous_results}
         
         # Round 1: All tools available
         if context.round == 1:
@@ -105,25 +553,21 @@ class AdaptiveToolPolicy:
         elif context.round == 2:
             if context.intent == QueryIntent.COMPARISON:
                 # For comparisons, allow search tools for additional content
-                available_tools = [t for t in context.all_tools 
-                                 if t['name'] == 'search_course_content']
+                available_tools = context.tool_named('search_course_content')
             
             elif context.intent == QueryIntent.MULTI_STEP:
                 # For multi-step queries, enable complementary tools
-                search_used = any(r.get('tool_name') == 'search_course_content' for r in previous_results)
-                outline_used = any(r.get('tool_name') == 'get_course_outline' for r in previous_results)
+                search_used = 'search_course_content' in used_tools
+                outline_used = 'get_course_outline' in used_tools
                 
                 if search_used and not outline_used:
-                    available_tools = [t for t in context.all_tools 
-                                     if t['name'] == 'get_course_outline']
+                    available_tools = context.tool_named('get_course_outline')
                 elif outline_used and not search_used:
-                    available_tools = [t for t in context.all_tools 
-                                     if t['name'] == 'search_course_content']
+                    available_tools = context.tool_named('search_course_content')
             
             elif self._previous_search_empty(previous_results):
                 # If search returned no results, try outline tool
-                available_tools = [t for t in context.all_tools 
-                                 if t['name'] == 'get_course_outline']
+                available_tools = context.tool_named('get_course_outline')
             
             elif self._previous_search_successful(previous_results):
                 # If search was successful, enable synthesis mode (no tools)
@@ -135,8 +579,7 @@ class AdaptiveToolPolicy:
         """Check if previous search returned empty results"""
         for result in results:
             if (result.get('tool_name') == 'search_course_content' and 
-                result.get('result') and 
-                ('no results' in result['result'].lower() or len(result['result'].strip()) < 50)):
+                (result['_no_results'] or result['_stripped_len'] < 50)):
                 return True
         return False
     
@@ -144,9 +587,8 @@ class AdaptiveToolPolicy:
         """Check if previous search was successful"""
         for result in results:
             if (result.get('tool_name') == 'search_course_content' and 
-                result.get('result') and 
-                'no results' not in result['result'].lower() and 
-                len(result['result'].strip()) > 100):
+                not result['_no_results'] and 
+                result['_stripped_len'] > 100):
                 return True
         return False
     
@@ -155,37 +597,38 @@ class AdaptiveToolPolicy:
         query_lower = query.lower()
         
         # Look for comparison keywords
-        comparison_keywords = ['compare', 'difference', 'vs', 'versus', 'between']
-        if any(kw in query_lower for kw in comparison_keywords):
+        if _COMPARISON_PATTERN.search(query_lower):
             return QueryIntent.COMPARISON
         
         # Look for outline requests
-        outline_keywords = ['outline', 'structure', 'overview', 'table of contents', 'lessons']
-        if any(kw in query_lower for kw in outline_keywords):
+        if _OUTLINE_PATTERN.search(query_lower):
             return QueryIntent.OUTLINE_REQUEST
         
         # Look for specific content searches
-        content_keywords = ['lesson', 'chapter', 'section', 'how to', 'what is', 'explain']
-        course_indicators = ['course', 'mcp', 'tutorial']
-        if (any(kw in query_lower for kw in content_keywords) and 
-            any(ci in query_lower for ci in course_indicators)):
+        is_course_related = _COURSE_PATTERN.search(query_lower) is not None
+        if is_course_related and _CONTENT_PATTERN.search(query_lower):
             return QueryIntent.CONTENT_SEARCH
         
         # Look for multi-step indicators
-        multi_step_keywords = ['then', 'after that', 'next', 'also show', 'and then']
-        if any(kw in query_lower for kw in multi_step_keywords):
+        if _MULTI_STEP_PATTERN.search(query_lower):
             return QueryIntent.MULTI_STEP
         
         # Check if query seems course-related at all
-        if any(ci in query_lower for ci in course_indicators):
+        if is_course_related:
             return QueryIntent.CONTENT_SEARCH
         
         # Default to general knowledge
         return QueryIntent.GENERAL_KNOWLEDGE
 
+# Stateless, so one instance classifies for AIGenerator without building its
+# sequential processor
+_INTENT_POLICY = AdaptiveToolPolicy()
+
 class TerminationManager:
     """Intelligent termination based on multiple criteria"""
     
+    __slots__ = ()  # Stateless; no per-instance __dict__
+    
     def should_terminate(self, context: ConversationContext, last_action_result: Dict[str, Any]) -> tuple[bool, str]:
         """Multi-factor termination decision"""
         
@@ -201,19 +644,24 @@ class TerminationManager:
             not last_action_result.get('tool_calls')):
             return True, "natural_completion"
         
-        # Multi-criteria scoring
-        criteria_scores = [
-            self._information_completeness(context),
-            self._user_satisfaction_threshold(context),
-            self._cost_benefit_analysis(context),
-            self._diminishing_returns_detected(context)
+        # Multi-criteria scoring in descending weight order. Every criterion scores
+        # in [0, 1], so stop as soon as the outcome can no longer change
+        criteria = [
+            (0.4, self._information_completeness),
+            (0.3, self._user_satisfaction_threshold),
+            (0.2, self._cost_benefit_analysis),
+            (0.1, self._diminishing_returns_detected)
         ]
         
-        weights = [0.4, 0.3, 0.2, 0.1]
-        weighted_score = sum(w * score for w, score in zip(weights, criteria_scores))
-        
-        if weighted_score > 0.75:
-            return True, "information_complete"
+        weighted = []
+        for i, (weight, criterion) in enumerate(criteria):
+            weighted.append(weight * criterion(context))
+            weighted_score = sum(weighted)
+            if weighted_score > 0.75:
+                return True, "information_complete"
+            # The slack keeps float rounding from pruning a borderline score
+            if weighted_score + sum(w for w, _ in criteria[i + 1:]) < 0.75 - 1e-9:
+                break
         
         return False, "continue"
     
@@ -238,10 +686,9 @@ class TerminationManager:
         # Check quality of results
         quality_score = 0.0
         for result in results:
-            result_text = result.get('result', '')
-            if len(result_text) > 200:  # Substantial content
+            if result['_result_len'] > 200:  # Substantial content
                 quality_score += 0.5
-            if 'no results' not in result_text.lower():  # Not empty
+            if not result['_no_results']:  # Not empty
                 quality_score += 0.3
         
         return min(1.0, quality_score)
@@ -274,15 +721,14 @@ class TerminationManager:
         if len(results) < 2:
             return 0.0
         
-        # Check if recent results are similar to previous ones
-        recent_result = results[-1].get('result', '')
-        previous_results = [r.get('result', '') for r in results[:-1]]
+        # Check if recent results are similar to previous ones, estimating the
+        # word-set Jaccard similarity from the precomputed signatures
+        recent_signature = results[-1]['_signature']
         
-        # Simple similarity check (could be enhanced with embeddings)
-        for prev_result in previous_results:
-            if len(recent_result) > 0 and len(prev_result) > 0:
-                common_words = set(recent_result.lower().split()) & set(prev_result.lower().split())
-                similarity = len(common_words) / max(len(recent_result.split()), len(prev_result.split()))
+        for prev in results[:-1]:
+            prev_signature = prev['_signature']
+            if recent_signature and prev_signature:
+                similarity = _estimate_jaccard(recent_signature, prev_signature)
                 if similarity > 0.7:  # High similarity suggests diminishing returns
                     return 1.0
         
@@ -291,6 +737,8 @@ class TerminationManager:
 class ErrorRecoveryManager:
     """Handles errors with intelligent recovery strategies"""
     
+    __slots__ = ()  # Stateless; no per-instance __dict__
+    
     def handle_error(self, error: Exception, context: ConversationContext) -> ConversationContext:
         """Context-aware error recovery"""
         context.error_recovery_attempts += 1
@@ -318,34 +766,66 @@ class ErrorRecoveryManager:
 class SequentialAIProcessor:
     """State-machine based processor for multi-round tool calling"""
     
-    def __init__(self, api_key: str, model: str, max_rounds: int = 2):
-        self.client = OpenAI(api_key=api_key)
+    __slots__ = (
+        "async_client", "model", "max_rounds", "stream", "tool_policy",
+        "termination_manager", "recovery_manager", "base_params", "small_model_params"
+    )
+    
+    def __init__(self, api_key: str, model: str, max_rounds: int = 2, stream: bool = False,
+                 async_client: Optional[AsyncOpenAI] = None, small_model: Optional[str] = None):
+        self.async_client = async_client or _build_async_client(api_key)
         self.model = model
         self.max_rounds = max_rounds
+        self.stream = stream
         self.tool_policy = AdaptiveToolPolicy()
         self.termination_manager = TerminationManager()
         self.recovery_manager = ErrorRecoveryManager()
         
-        # Base API parameters
+        # Base API parameters; the cache key routes every round to the same warm
+        # prefix since the system prompt is identical across queries
         self.base_params = {
             "model": self.model,
             "temperature": 0,
-            "max_tokens": 800
+            "max_tokens": 800,
+            "prompt_cache_key": PROMPT_CACHE_KEY
         }
+        # Same parameters on the small model, for short general knowledge queries
+        self.small_model_params = {**self.base_params, "model": small_model} if small_model else None
     
     def process_query(self, query: str, tools: List[Dict], tool_manager, 
-                     conversation_history: Optional[str] = None) -> ProcessingResult:
-        """Event-driven multi-round processing"""
+                     conversation_history: Optional[List[Dict[str, str]]] = None,
+                     user_query: Optional[str] = None) -> ProcessingResult:
+        """Synchronous wrapper around aprocess_query for callers without an event loop"""
+        return _run_sync(self.aprocess_query(query, tools, tool_manager, conversation_history, user_query))
+    
+    async def aprocess_query(self, query: str, tools: List[Dict], tool_manager, 
+                             conversation_history: Optional[List[Dict[str, str]]] = None,
+                             user_query: Optional[str] = None) -> ProcessingResult:
+        """
+        Event-driven multi-round processing.
+        
+        query is the message sent to the model; user_query, when given, is the
+        question as the user asked it, before any prompt wrapping, and is what
+        the intent is classified and the model is routed on.
+        """
         
         # Initialize conversation context
         context = ConversationContext(
             query=query,
             max_rounds=self.max_rounds,
-            all_tools=tools.copy() if tools else []
+            all_tools=list(tools) if tools else []
         )
         
-        # Classify intent
-        context.intent = self.tool_policy.classify_intent(query)
+        # Classify intent on the user's own words; a wrapping prompt would read as course-related
+        context.intent = self.tool_policy.classify_intent(user_query or query)
+        
+        # General knowledge queries are not expected to use their tools, so only they may use the small model
+        if context.intent != QueryIntent.GENERAL_KNOWLEDGE:
+            context.model_params = self.base_params
+        elif self.small_model_params and _route_to_small_model(user_query or query, conversation_history, tools_needed=False):
+            context.model_params = self.small_model_params
+        else:
+            context.model_params = self.base_params
         
         # Build initial messages
         context.messages = self._build_initial_messages(query, conversation_history)
@@ -362,7 +842,7 @@ class SequentialAIProcessor:
                 available_tools = self.tool_policy.determine_available_tools(context)
                 
                 # Execute round
-                action_result = self._execute_round(context, available_tools, tool_manager)
+                action_result = await self._aexecute_round(context, available_tools, tool_manager)
                 
                 # Check termination conditions
                 should_terminate, reason = self.termination_manager.should_terminate(context, action_result)
@@ -376,90 +856,55 @@ class SequentialAIProcessor:
         # Finalize response
         return self._finalize_response(context, action_result)
     
-    def _build_initial_messages(self, query: str, conversation_history: Optional[str] = None) -> List[Dict[str, Any]]:
+    def _build_initial_messages(self, query: str, conversation_history: Optional[List[Dict[str, str]]] = None) -> List[Dict[str, Any]]:
         """Build initial message array for the conversation"""
         messages = []
         
-        # Enhanced system prompt for sequential processing
-        system_content = self._build_system_prompt(conversation_history)
-        messages.append({"role": "system", "content": system_content})
+        # Static system prompt first so it forms a byte-identical, cacheable prefix
+        messages.append({"role": "system", "content": self._build_system_prompt()})
+        
+        # Prior turns as their own messages; the session manager trims history in steps,
+        # so between trims each turn only appends to the cached prefix
+        if conversation_history:
+            messages.extend(conversation_history)
         
         # Add user query
         messages.append({"role": "user", "content": query})
         
         return messages
     
-    def _build_system_prompt(self, conversation_history: Optional[str] = None) -> str:
+    def _build_system_prompt(self) -> str:
         """Build enhanced system prompt for sequential processing"""
-        base_prompt = """You are an AI assistant specialized in course materials and educational content with access to comprehensive tools for course information.
-
-Available Tools:
-1. **search_course_content**: For searching specific course content and detailed educational materials
-2. **get_course_outline**: For retrieving course outlines with title, course link, and complete lesson lists
-
-Sequential Tool Usage:
-- You can make tool calls across multiple rounds of reasoning (max 2 rounds)
-- Round 1: Make initial tool calls to gather information
-- Round 2: If needed, make additional tool calls based on Round 1 results to complete your understanding
-- Build upon previous tool results to provide comprehensive answers
-- Examples requiring multiple rounds:
-  * Comparing content from different lessons or courses
-  * Getting course outline then searching for specific lesson content
-  * Searching for related topics across multiple courses
-
-Tool Usage Guidelines:
-- Use **search_course_content** for questions about specific course content or detailed educational materials
-- Use **get_course_outline** for questions about course structure, lesson lists, or when users want to see what's covered in a course
-- Synthesize tool results into accurate, fact-based responses
-- If tools yield no results, state this clearly without offering alternatives
-
-Response Protocol:
-- **General knowledge questions**: Answer using existing knowledge without using tools
-- **Course-specific content questions**: Use search_course_content tool first, then answer
-- **Course outline/structure questions**: Use get_course_outline tool first, then answer
-- **Complex queries**: Use multiple rounds as needed to gather complete information
-- **No meta-commentary**:
-  - Provide direct answers only — no reasoning process, tool explanations, or question-type analysis
-  - Do not mention "based on the search results" or "based on the outline"
-
-For outline queries, always include:
-- Course title
-- Course link
-- Complete lesson list with lesson numbers and titles
-
-All responses must be:
-1. **Brief, Concise and focused** - Get to the point quickly
-2. **Educational** - Maintain instructional value
-3. **Clear** - Use accessible language
-4. **Example-supported** - Include relevant examples when they aid understanding
-Provide only the direct answer to what was asked."""
-        
-        if conversation_history:
-            return f"{base_prompt}\n\nPrevious conversation:\n{conversation_history}"
-        return base_prompt
+        return SEQUENTIAL_SYSTEM_PROMPT
     
-    def _execute_round(self, context: ConversationContext, available_tools: List[Dict], 
-                      tool_manager) -> Dict[str, Any]:
+    async def _aexecute_round(self, context: ConversationContext, available_tools: List[Dict], 
+                              tool_manager) -> Dict[str, Any]:
         """Execute a single round of conversation"""
         
-        # Prepare API parameters
+        # Prepare API parameters. The message list is only ever appended to, so
+        # it is sent as-is: earlier rounds stay a cached prefix and need no copy
         api_params = {
-            **self.base_params,
-            "messages": context.messages.copy()
+            **context.model_params,
+            "messages": context.messages
         }
         
         # Add tools if available
         if available_tools:
-            openai_tools = self._convert_tools_to_openai_format(available_tools)
-            api_params["tools"] = openai_tools
+            api_params["tools"] = available_tools
             api_params["tool_choice"] = "auto"
+            # Let the model batch independent lookups into one turn; they run concurrently
+            api_params["parallel_tool_calls"] = True
         
-        # Get response from OpenAI
-        response = self.client.chat.completions.create(**api_params)
+        # Get response from OpenAI; when streaming, tool calls already ran while the rest was generated
+        outcomes = None
+        if self.stream:
+            response, outcomes = await self._astream_round(api_params, tool_manager)
+        else:
+            response = await self.async_client.chat.completions.create(**api_params)
         
         # Process response
         if response.choices[0].message.tool_calls and tool_manager:
-            return self._handle_tool_execution(response, context, tool_manager)
+            return await self._ahandle_tool_execution(response, context, tool_manager, outcomes)
         else:
             # Direct response without tools
             context.state = ConversationState.REASONING
@@ -473,48 +918,74 @@ Provide only the direct answer to what was asked."""
                 "tool_calls": False
             }
     
-    def _handle_tool_execution(self, response, context: ConversationContext, tool_manager) -> Dict[str, Any]:
-        """Handle tool execution and update context"""
+    async def _astream_round(self, api_params: Dict[str, Any], tool_manager) -> tuple:
+        """
+        Consume a streamed completion, dispatching each tool call as soon as its
+        arguments are complete instead of waiting for the whole response.
+        
+        Returns a response shaped like a non-streamed completion, plus the tool
+        outcomes in call order (None when no tools were dispatched).
+        """
+        content_parts = []
+        calls: Dict[int, Dict[str, Any]] = {}
+        tasks = {}
+        limit = asyncio.Semaphore(TOOL_CONCURRENCY_LIMIT)
+        
+        def dispatch(index: int):
+            if tool_manager and index in calls and index not in tasks:
+                tasks[index] = asyncio.create_task(
+                    _arun_tool_call(_as_tool_call(calls[index]), tool_manager, limit)
+                )
+        
+        try:
+            stream = await self.async_client.chat.completions.create(**api_params, stream=True)
+            async for chunk in stream:
+                if not chunk.choices:
+                    continue
+                delta = chunk.choices[0].delta
+                if delta.content:
+                    content_parts.append(delta.content)
+                for tc in delta.tool_calls or []:
+                    if tc.index not in calls:
+                        # A new index opening means every earlier call is complete
+                        for index in list(calls):
+                            dispatch(index)
+                    _merge_tool_call_delta(calls, tc)
+            
+            # The last call is complete once the stream ends
+            for index in list(calls):
+                dispatch(index)
+            outcomes = list(await asyncio.gather(*(tasks[i] for i in sorted(tasks)))) or None
+        finally:
+            # If the stream failed partway, stop the tool calls already dispatched
+            # and collect them so none is left running or unretrieved
+            for task in tasks.values():
+                task.cancel()
+            await asyncio.gather(*tasks.values(), return_exceptions=True)
+        
+        tool_calls = [_as_tool_call(calls[i]) for i in sorted(calls)] or None
+        message = SimpleNamespace(content="".join(content_parts) or None, tool_calls=tool_calls)
+        return SimpleNamespace(choices=[SimpleNamespace(message=message)]), outcomes
+    
+    async def _ahandle_tool_execution(self, response, context: ConversationContext, tool_manager,
+                                      outcomes: Optional[List[tuple]] = None) -> Dict[str, Any]:
+        """Handle tool execution and update context, reusing outcomes already produced while streaming"""
         
         # Add assistant message with tool calls
-        assistant_message = {
-            "role": "assistant",
-            "content": response.choices[0].message.content or "",
-            "tool_calls": [
-                {
-                    "id": tc.id,
-                    "type": tc.type,
-                    "function": {
-                        "name": tc.function.name,
-                        "arguments": tc.function.arguments
-                    }
-                } for tc in response.choices[0].message.tool_calls
-            ]
-        }
-        context.messages.append(assistant_message)
+        context.messages.append(_assistant_message(response.choices[0].message))
         
         tools_executed = []
+        tool_calls = response.choices[0].message.tool_calls
         
-        # Execute all tool calls
-        for tool_call in response.choices[0].message.tool_calls:
-            try:
-                tool_args = json.loads(tool_call.function.arguments)
-            except json.JSONDecodeError:
-                tool_args = {}
-            
-            # Execute the tool
-            try:
-                tool_result = tool_manager.execute_tool(
-                    tool_call.function.name, 
-                    **tool_args
-                )
+        # Execute all tool calls concurrently off the event loop, at most
+        # TOOL_CONCURRENCY_LIMIT at a time; gather() returns results in call
+        # order so messages stay aligned with tool_call ids
+        if outcomes is None:
+            outcomes = await _arun_tool_calls(tool_calls, tool_manager)
+        
+        for tool_call, (tool_args, tool_result, succeeded) in zip(tool_calls, outcomes):
+            if succeeded:
                 tools_executed.append(tool_call.function.name)
-            except Exception as e:
-                tool_result = f"Error executing tool: {str(e)}"
-            
-            # Truncate if too long
-            if len(tool_result) > 2000:
-                tool_result = tool_result[:2000] + "... [truncated]"
             
             # Add tool result to messages
             context.messages.append({
@@ -524,13 +995,7 @@ Provide only the direct answer to what was asked."""
             })
             
             # Track in execution history
-            context.tool_execution_history.append({
-                "round": context.round,
-                "tool_name": tool_call.function.name,
-                "arguments": tool_args,
-                "result": tool_result,
-                "timestamp": time.time()
-            })
+            context.record_tool_execution(tool_call.function.name, tool_args, tool_result, tool_call.id)
         
         # Get follow-up response if this is not the final round
         if context.round < context.max_rounds:
@@ -544,9 +1009,9 @@ Provide only the direct answer to what was asked."""
             # Final round - get synthesis response
             final_params = {
                 **self.base_params,
-                "messages": context.messages
+                "messages": self._build_synthesis_messages(context)
             }
-            final_response = self.client.chat.completions.create(**final_params)
+            final_response = await self.async_client.chat.completions.create(**final_params)
             
             context.messages.append({
                 "role": "assistant",
@@ -560,20 +1025,43 @@ Provide only the direct answer to what was asked."""
                 "tool_calls": True
             }
     
-    def _convert_tools_to_openai_format(self, anthropic_tools: List[Dict]) -> List[Dict]:
-        """Convert Anthropic tool format to OpenAI function calling format"""
-        openai_tools = []
-        for tool in anthropic_tools:
-            openai_tool = {
-                "type": "function",
-                "function": {
-                    "name": tool["name"],
-                    "description": tool["description"],
-                    "parameters": tool["input_schema"]
-                }
-            }
-            openai_tools.append(openai_tool)
-        return openai_tools
+    def _build_synthesis_messages(self, context: ConversationContext) -> List[Dict[str, Any]]:
+        """
+        Bound the final-synthesis prompt: keep the preamble (system prompt, prior
+        turns and the current query) plus the most recent MAX_CONTEXT_MESSAGES of
+        the tool rounds, and shorten tool outputs from rounds older than the
+        previous one. The full history stays in context.tool_execution_history.
+        """
+        messages = context.messages
+        # The preamble ends with the current query, just before the first tool-call round
+        preamble_end = next((i for i, m in enumerate(messages) if m.get("tool_calls")), len(messages))
+        body = messages[preamble_end:]
+        stale_ids = {
+            entry["tool_call_id"] for entry in context.tool_execution_history
+            if entry["round"] < context.round - 1
+        }
+        
+        # Common case: nothing to trim, so the unchanged list keeps its cached prefix
+        if len(body) <= MAX_CONTEXT_MESSAGES and not stale_ids:
+            return messages
+        
+        if len(body) > MAX_CONTEXT_MESSAGES:
+            start = len(body) - MAX_CONTEXT_MESSAGES
+            # Never open on a tool message whose assistant tool_calls message was dropped
+            while start < len(body) and body[start]["role"] == "tool":
+                start += 1
+            body = body[start:]
+        
+        if stale_ids:
+            body = [
+                {**m, "content": m["content"][:ELIDED_TOOL_OUTPUT_CHARS] + "... [older-round-tool-output elided]"}
+                if m["role"] == "tool" and m["tool_call_id"] in stale_ids
+                and len(m["content"]) > ELIDED_TOOL_OUTPUT_CHARS
+                else m
+                for m in body
+            ]
+        
+        return messages[:preamble_end] + body
     
     def _finalize_response(self, context: ConversationContext, last_action: Dict[str, Any]) -> ProcessingResult:
         """Create final processing result"""
@@ -599,7 +1087,7 @@ Provide only the direct answer to what was asked."""
         ]))
         
         return ProcessingResult(
-            content=final_content or "Unable to generate response",
+            content=final_content or FALLBACK_RESPONSE,
             rounds_used=context.round,
             tools_executed=tools_executed,
             termination_reason=termination_reason,
@@ -611,44 +1099,26 @@ class AIGenerator:
     """Handles interactions with OpenAI's GPT API for generating responses with sequential tool calling"""
     
     # Legacy system prompt for backward compatibility
-    SYSTEM_PROMPT = """ You are an AI assistant specialized in course materials and educational content with access to comprehensive tools for course information.
-
-Available Tools:
-1. **search_course_content**: For searching specific course content and detailed educational materials
-2. **get_course_outline**: For retrieving course outlines with title, course link, and complete lesson lists
-
-Tool Usage Guidelines:
-- Use **search_course_content** for questions about specific course content or detailed educational materials
-- Use **get_course_outline** for questions about course structure, lesson lists, or when users want to see what's covered in a course
-- **One tool call per query maximum**
-- Synthesize tool results into accurate, fact-based responses
-- If tools yield no results, state this clearly without offering alternatives
-
-Response Protocol:
-- **General knowledge questions**: Answer using existing knowledge without using tools
-- **Course-specific content questions**: Use search_course_content tool first, then answer
-- **Course outline/structure questions**: Use get_course_outline tool first, then answer
-- **No meta-commentary**:
- - Provide direct answers only — no reasoning process, tool explanations, or question-type analysis
- - Do not mention "based on the search results" or "based on the outline"
-
-For outline queries, always include:
-- Course title
-- Course link
-- Complete lesson list with lesson numbers and titles
-
-All responses must be:
-1. **Brief, Concise and focused** - Get to the point quickly
-2. **Educational** - Maintain instructional value
-3. **Clear** - Use accessible language
-4. **Example-supported** - Include relevant examples when they aid understanding
-Provide only the direct answer to what was asked.
-"""
+    SYSTEM_PROMPT = LEGACY_SYSTEM_PROMPT
     
-    def __init__(self, api_key: str, model: str, enable_sequential: bool = True):
-        self.client = OpenAI(api_key=api_key)
+    __slots__ = (
+        "client", "model", "small_model", "enable_sequential", "speculative", "_api_key", "_stream",
+        "base_params", "small_model_params", "_param_items", "_small_param_items",
+        "_sequential_processor", "_batcher"
+    )
+    
+    def __init__(self, api_key: str, model: str, enable_sequential: bool = True, stream: bool = False,
+                 speculative: bool = False, small_model: Optional[str] = None):
+        self.client = _build_async_client(api_key)
         self.model = model
+        # Cheaper, faster model for short standalone queries that need no tools
+        self.small_model = small_model
         self.enable_sequential = enable_sequential
+        # Race the single-round path against sequential processing for queries
+        # one round usually answers; costs a duplicate request when enabled
+        self.speculative = speculative
+        self._api_key = api_key
+        self._stream = stream
         
         # Pre-build base API parameters
         self.base_params = {
@@ -656,24 +1126,55 @@ Provide only the direct answer to what was asked.
             "temperature": 0,
             "max_tokens": 800
         }
+        self.small_model_params = {**self.base_params, "model": small_model} if small_model else None
+        # Immutable snapshots of the above; each request copies one and adds only its own keys
+        self._param_items = tuple(self.base_params.items())
+        self._small_param_items = tuple(self.small_model_params.items()) if small_model else None
+        
+        # Sequential processor is built on first tool-using query
+        self._sequential_processor: Optional[SequentialAIProcessor] = None
         
-        # Initialize sequential processor
-        if self.enable_sequential:
-            self.sequential_processor = SequentialAIProcessor(api_key, model, max_rounds=2)
+        # Coalesces concurrent tool-free completions into bursts
+        self._batcher = _BatchingCompleter(self.client)
+    
+    @property
+    def sequential_processor(self) -> SequentialAIProcessor:
+        """Sequential processor sharing this generator's client, constructed on first access"""
+        if self._sequential_processor is None:
+            self._sequential_processor = SequentialAIProcessor(
+                self._api_key, self.model, max_rounds=2, stream=self._stream, async_client=self.client,
+                small_model=self.small_model
+            )
+        return self._sequential_processor
+    
+    async def warm_up(self):
+        """Open the connection to OpenAI ahead of the first query with a free model lookup"""
+        await self.client.models.retrieve(self.model)
     
     def generate_response(self, query: str,
-                         conversation_history: Optional[str] = None,
+                         conversation_history: Optional[List[Dict[str, str]]] = None,
                          tools: Optional[List] = None,
-                         tool_manager=None) -> str:
+                         tool_manager=None,
+                         user_query: Optional[str] = None) -> str:
+        """Synchronous wrapper around agenerate_response for callers without an event loop"""
+        return _run_sync(self.agenerate_response(query, conversation_history, tools, tool_manager, user_query))
+    
+    async def agenerate_response(self, query: str,
+                                 conversation_history: Optional[List[Dict[str, str]]] = None,
+                                 tools: Optional[List] = None,
+                                 tool_manager=None,
+                                 user_query: Optional[str] = None) -> str:
         """
         Generate AI response with optional tool usage and conversation context.
         Supports sequential tool calling for complex queries.
         
         Args:
             query: The user's question or request
-            conversation_history: Previous messages for context
+            conversation_history: Prior turns as {"role", "content"} messages
             tools: Available tools the AI can use
             tool_manager: Manager to execute tools
+            user_query: The question before prompt wrapping, used to classify
+                intent and route the model; defaults to query
             
         Returns:
             Generated response as string
@@ -681,82 +1182,182 @@ Provide only the direct answer to what was asked.
         
         # Use sequential processor if enabled and tools are available
         if self.enable_sequential and tools and tool_manager:
+            if (self.speculative and
+                    _INTENT_POLICY.classify_intent(user_query or query) in SPECULATIVE_INTENTS):
+                return await self._speculative_generate_response(
+                    query, conversation_history, tools, tool_manager, user_query
+                )
             try:
-                result = self.sequential_processor.process_query(
+                result = await self.sequential_processor.aprocess_query(
                     query=query,
                     tools=tools,
                     tool_manager=tool_manager,
-                    conversation_history=conversation_history
+                    conversation_history=conversation_history,
+                    user_query=user_query
                 )
                 return result.content
             except Exception as e:
                 # Fallback to legacy mode on error
                 logging.warning(f"Sequential processing failed, falling back to legacy mode: {e}")
-                return self._legacy_generate_response(query, conversation_history, tools, tool_manager)
+                return await self._legacy_generate_response(query, conversation_history, tools, tool_manager, user_query)
         else:
             # Use legacy single-round processing
-            return self._legacy_generate_response(query, conversation_history, tools, tool_manager)
+            return await self._legacy_generate_response(query, conversation_history, tools, tool_manager, user_query)
+    
+    async def _speculative_generate_response(self, query: str, conversation_history: Optional[List[Dict[str, str]]],
+                                             tools: List, tool_manager, user_query: Optional[str] = None) -> str:
+        """
+        Run sequential processing and the single-round path side by side and
+        return whichever succeeds first. If both fail, the single-round error is
+        raised, matching the sequential-then-legacy fallback.
+        """
+        # Each path collects its own sources, so only the winner's reach the caller
+        sequential = asyncio.create_task(_with_own_sources(self.sequential_processor.aprocess_query(
+            query=query,
+            tools=tools,
+            tool_manager=tool_manager,
+            conversation_history=conversation_history,
+            user_query=user_query
+        ), tool_manager))
+        single_round = asyncio.create_task(_with_own_sources(
+            self._legacy_generate_response(query, conversation_history, tools, tool_manager, user_query), tool_manager
+        ))
+        
+        try:
+            pending = {sequential, single_round}
+            while pending:
+                done, pending = await asyncio.wait(pending, return_when=asyncio.FIRST_COMPLETED)
+                for task in done:
+                    if task.exception() is None:
+                        result, sources = task.result()
+                        if sources and callable(getattr(type(tool_manager), "record_sources", None)):
+                            tool_manager.record_sources(sources)
+                        return result.content if task is sequential else result
+                    if task is sequential:
+                        logging.warning(f"Sequential processing failed during speculative run: {task.exception()}")
+            return single_round.result()
+        finally:
+            # The losing path is cancelled; its result would be discarded anyway
+            sequential.cancel()
+            single_round.cancel()
     
-    def _legacy_generate_response(self, query: str,
-                                 conversation_history: Optional[str] = None,
+    async def _legacy_generate_response(self, query: str,
+                                 conversation_history: Optional[List[Dict[str, str]]] = None,
                                  tools: Optional[List] = None,
-                                 tool_manager=None) -> str:
+                                 tool_manager=None,
+                                 user_query: Optional[str] = None) -> str:
         """
         Legacy single-round response generation for backward compatibility.
         """
+        api_params = self._build_legacy_params(query, conversation_history, tools, user_query)
+        
+        # Get response from OpenAI; tool-free requests are micro-batched with concurrent ones
+        if tools:
+            response = await self.client.chat.completions.create(**api_params)
+        else:
+            response = await self._batcher.submit(api_params)
+        
+        # Handle tool execution if needed
+        if response.choices[0].message.tool_calls and tool_manager:
+            return await self._handle_tool_execution(response, api_params, tool_manager)
+        
+        # Return direct response
+        return response.choices[0].message.content
+    
+    async def generate_response_stream(self, query: str,
+                                       conversation_history: Optional[List[Dict[str, str]]] = None,
+                                       tools: Optional[List] = None,
+                                       tool_manager=None,
+                                       user_query: Optional[str] = None) -> AsyncIterator[str]:
+        """
+        Stream the answer as text chunks as soon as the model produces them.
+        
+        Follows the single-round path: if the streamed completion ends by
+        requesting tools, they are executed and a second streamed completion
+        over their results produces the answer.
+        """
+        api_params = self._build_legacy_params(query, conversation_history, tools, user_query)
+        
+        calls: Dict[int, Dict[str, Any]] = {}
+        content_parts = []
+        finish_reason = None
+        stream = await self.client.chat.completions.create(**api_params, stream=True)
+        async for chunk in stream:
+            if not chunk.choices:
+                continue
+            choice = chunk.choices[0]
+            delta = choice.delta
+            if delta.content:
+                content_parts.append(delta.content)
+                yield delta.content
+            for tc in delta.tool_calls or []:
+                _merge_tool_call_delta(calls, tc)
+            if choice.finish_reason:
+                finish_reason = choice.finish_reason
+        
+        if finish_reason != "tool_calls" or not calls or not tool_manager:
+            return
+        
+        message = SimpleNamespace(
+            content="".join(content_parts) or None,
+            tool_calls=[_as_tool_call(calls[i]) for i in sorted(calls)]
+        )
+        # The message list was built for this request alone, so extend it in place
+        messages = api_params["messages"]
+        await self._append_tool_round(messages, message, tool_manager)
+        
+        # Stream the final answer without tools
+        stream = await self.client.chat.completions.create(**self._build_params(messages), stream=True)
+        async for chunk in stream:
+            if chunk.choices and chunk.choices[0].delta.content:
+                yield chunk.choices[0].delta.content
+    
+    def _build_legacy_params(self, query: str, conversation_history: Optional[List[Dict[str, str]]],
+                             tools: Optional[List], user_query: Optional[str] = None) -> Dict[str, Any]:
+        """Build single-round API parameters for a query, routed on user_query when given"""
         
         # Build messages array for OpenAI format
         messages = []
         
-        # Add system message
-        system_content = (
-            f"{self.SYSTEM_PROMPT}\n\nPrevious conversation:\n{conversation_history}"
-            if conversation_history 
-            else self.SYSTEM_PROMPT
-        )
-        messages.append({"role": "system", "content": system_content})
+        # Add system message, then prior turns as role-tagged messages so the prefix
+        # stays identical across turns and provider-side prompt caching can reuse it
+        messages.append({"role": "system", "content": self.SYSTEM_PROMPT})
+        if conversation_history:
+            messages.extend(conversation_history)
         
         # Add user message
         messages.append({"role": "user", "content": query})
         
-        # Prepare API call parameters
-        api_params = {
-            **self.base_params,
-            "messages": messages
-        }
+        # Prepare API call parameters. Tools stay on offer, but a general knowledge
+        # question is not expected to need them, so it may still go to the small model
+        routing_query = user_query or query
+        tools_needed = bool(tools) and (
+            _INTENT_POLICY.classify_intent(routing_query) != QueryIntent.GENERAL_KNOWLEDGE
+        )
+        param_items = self._route_model(routing_query, conversation_history, tools_needed)
+        return self._build_params(messages, tools, param_items)
+    
+    def _build_params(self, messages: List[Dict[str, Any]], tools: Optional[List] = None,
+                      param_items: Optional[tuple] = None) -> Dict[str, Any]:
+        """API parameters for one request, from the main model's base parameters unless others are given"""
+        params = dict(param_items or self._param_items)
+        params["messages"] = messages
         
-        # Add tools if available (convert to OpenAI format)
+        # Add tools if available; definitions are already in OpenAI format
         if tools:
-            openai_tools = self._convert_tools_to_openai_format(tools)
-            api_params["tools"] = openai_tools
-            api_params["tool_choice"] = "auto"
+            params["tools"] = tools
+            params["tool_choice"] = "auto"
         
-        # Get response from OpenAI
-        response = self.client.chat.completions.create(**api_params)
-        
-        # Handle tool execution if needed
-        if response.choices[0].message.tool_calls and tool_manager:
-            return self._handle_tool_execution(response, api_params, tool_manager)
-        
-        # Return direct response
-        return response.choices[0].message.content
+        return params
     
-    def _convert_tools_to_openai_format(self, anthropic_tools: List[Dict]) -> List[Dict]:
-        """Convert Anthropic tool format to OpenAI function calling format"""
-        openai_tools = []
-        for tool in anthropic_tools:
-            openai_tool = {
-                "type": "function",
-                "function": {
-                    "name": tool["name"],
-                    "description": tool["description"],
-                    "parameters": tool["input_schema"]
-                }
-            }
-            openai_tools.append(openai_tool)
-        return openai_tools
+    def _route_model(self, query: str, conversation_history: Optional[List[Dict[str, str]]],
+                     tools_needed: bool) -> tuple:
+        """Base parameter items for a query: the small model when it qualifies, else the main model"""
+        if self._small_param_items and _route_to_small_model(query, conversation_history, tools_needed):
+            return self._small_param_items
+        return self._param_items
     
-    def _handle_tool_execution(self, initial_response, base_params: Dict[str, Any], tool_manager):
+    async def _handle_tool_execution(self, initial_response, base_params: Dict[str, Any], tool_manager):
         """
         Handle execution of tool calls and get follow-up response.
         
@@ -768,60 +1369,32 @@ Provide only the direct answer to what was asked.
         Returns:
             Final response text after tool execution
         """
-        # Start with existing messages
-        messages = base_params["messages"].copy()
+        # Extend the request's own message list in place; nothing else holds it
+        messages = base_params["messages"]
+        await self._append_tool_round(messages, initial_response.choices[0].message, tool_manager)
+        
+        # Prepare final API call without tools
+        final_params = self._build_params(messages)
+        
+        # Get final response
+        final_response = await self.client.chat.completions.create(**final_params)
+        return final_response.choices[0].message.content
+    
+    async def _append_tool_round(self, messages: List[Dict[str, Any]], message, tool_manager) -> None:
+        """Append the assistant's tool calls and their results to messages"""
         
         # Add AI's response with tool calls
-        assistant_message = {
-            "role": "assistant",
-            "content": initial_response.choices[0].message.content or "",
-            "tool_calls": [
-                {
-                    "id": tc.id,
-                    "type": tc.type,
-                    "function": {
-                        "name": tc.function.name,
-                        "arguments": tc.function.arguments
-                    }
-                } for tc in initial_response.choices[0].message.tool_calls
-            ]
-        }
-        messages.append(assistant_message)
+        messages.append(_assistant_message(message))
         
-        # Execute all tool calls and add results
-        for tool_call in initial_response.choices[0].message.tool_calls:
-            # Parse tool arguments
-            try:
-                tool_args = json.loads(tool_call.function.arguments)
-            except json.JSONDecodeError:
-                tool_args = {}
-            
-            # Execute the tool
-            try:
-                tool_result = tool_manager.execute_tool(
-                    tool_call.function.name, 
-                    **tool_args
-                )
-            except Exception as e:
-                tool_result = f"Error executing tool: {str(e)}"
-            
-            # Truncate tool result if too long to avoid token limits
-            if len(tool_result) > 2000:
-                tool_result = tool_result[:2000] + "... [truncated]"
-            
+        # Execute all tool calls concurrently, capped to avoid token limits;
+        # outcomes come back in call order to pair them with their tool_call ids
+        tool_calls = message.tool_calls
+        outcomes = await _arun_tool_calls(tool_calls, tool_manager)
+        
+        for tool_call, (_, tool_result, _) in zip(tool_calls, outcomes):
             # Add tool result message
             messages.append({
                 "role": "tool",
                 "tool_call_id": tool_call.id,
                 "content": tool_result
-            })
-        
-        # Prepare final API call without tools
-        final_params = {
-            **self.base_params,
-            "messages": messages
-        }
-        
-        # Get final response
-        final_response = self.client.chat.completions.create(**final_params)
-        return final_response.choices[0].message.content
\ No newline at end of file
+            })
\ No newline at end of file
@@ -2,24 +2,20 @@ import warnings
 warnings.filterwarnings("ignore", message="resource_tracker: There appear to be.*")
 
 from fastapi import FastAPI, HTTPException
+from fastapi.responses import ORJSONResponse, StreamingResponse
 from fastapi.middleware.cors import CORSMiddleware
 from fastapi.staticfiles import StaticFiles
-from fastapi.middleware.trustedhost import TrustedHostMiddleware
 from pydantic import BaseModel
 from typing import List, Optional, Union, Dict, Any
 import os
+import asyncio
+import orjson
 
 from config import config
 from rag_system import RAGSystem
 
-# Initialize FastAPI app
-app = FastAPI(title="Course Materials RAG System", root_path="")
-
-# Add trusted host middleware for proxy
-app.add_middleware(
-    TrustedHostMiddleware,
-    allowed_hosts=["*"]
-)
+# Initialize FastAPI app; JSON responses are encoded with orjson, as the stream events are
+app = FastAPI(title="Course Materials RAG System", root_path="", default_response_class=ORJSONResponse)
 
 # Enable CORS with proper settings for proxy
 app.add_middleware(
@@ -63,7 +59,7 @@ async def query_documents(request: QueryRequest):
             session_id = rag_system.session_manager.create_session()
         
         # Process query using RAG system
-        answer, sources = rag_system.query(request.query, session_id)
+        answer, sources = await rag_system.aquery(request.query, session_id)
         
         return QueryResponse(
             answer=answer,
@@ -77,6 +73,37 @@ async def query_documents(request: QueryRequest):
         traceback.print_exc()
         raise HTTPException(status_code=500, detail=str(e))
 
+@app.post("/api/query/stream")
+async def query_documents_stream(request: QueryRequest):
+    """
+    Process a query and stream the answer as Server-Sent Events: a
+    {"token": ...} event per chunk, then {"sources": [...], "session_id": ...}
+    """
+    # Create session if not provided
+    session_id = request.session_id
+    if not session_id:
+        session_id = rag_system.session_manager.create_session()
+    
+    async def events():
+        try:
+            async for event in rag_system.aquery_stream(request.query, session_id):
+                if "sources" in event:
+                    event = {**event, "session_id": session_id}
+                yield b"data: " + orjson.dumps(event) + b"\n\n"
+        except Exception as e:
+            # Headers are already sent, so report the failure in-band
+            print(f"Error in streaming query endpoint: {e}")
+            import traceback
+            traceback.print_exc()
+            yield b"data: " + orjson.dumps({"error": str(e), "session_id": session_id}) + b"\n\n"
+    
+    return StreamingResponse(
+        events(),
+        media_type="text/event-stream",
+        # Keep proxies from buffering the stream
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"}
+    )
+
 @app.get("/api/courses", response_model=CourseStats)
 async def get_course_stats():
     """Get course analytics and statistics"""
@@ -103,7 +130,8 @@ async def startup_event():
         print(f"Loading initial documents from: {docs_path}")
         try:
             # Use clear_existing=True to ensure fresh data load
-            courses, chunks = rag_system.add_course_folder(docs_path, clear_existing=True)
+            # Ingest off the event loop; parsing and embedding are blocking work
+            courses, chunks = await asyncio.to_thread(rag_system.add_course_folder, docs_path, clear_existing=True)
             print(f"✅ Loaded {courses} courses with {chunks} chunks")
             
             # Verify the load was successful
@@ -124,24 +152,10 @@ async def startup_event():
                 found_docs = os.path.join(root, "docs")
                 print(f"🔍 Found docs directory at: {found_docs}")
                 break
-
-# Custom static file handler with no-cache headers for development
-from fastapi.staticfiles import StaticFiles
-from fastapi.responses import FileResponse
-import os
-from pathlib import Path
-
-
-class DevStaticFiles(StaticFiles):
-    async def get_response(self, path: str, scope):
-        response = await super().get_response(path, scope)
-        if isinstance(response, FileResponse):
-            # Add no-cache headers for development
-            response.headers["Cache-Control"] = "no-cache, no-store, must-revalidate"
-            response.headers["Pragma"] = "no-cache"
-            response.headers["Expires"] = "0"
-        return response
-    
     
+    # Warm lazily initialized components so the first query skips the cold start
+    warmed = await rag_system.warm_up()
+    print(f"🔥 Warmed up: {', '.join(warmed) or 'nothing'}")
+
 # Serve static files for the frontend
 app.mount("/", StaticFiles(directory="../frontend", html=True), name="static")
\ No newline at end of file
@@ -11,6 +11,7 @@ class Config:
     # OpenAI API settings
     OPENAI_API_KEY: str = os.getenv("OPENAI_API_KEY", "")
     OPENAI_MODEL: str = "gpt-4o-mini"  # Cost-effective model with good performance
+    OPENAI_SMALL_MODEL: str = "gpt-4.1-nano"  # Faster model for short queries that need no tools
     
     # Embedding model settings
     EMBEDDING_MODEL: str = "all-MiniLM-L6-v2"
@@ -21,6 +22,14 @@ class Config:
     MAX_RESULTS: int = 5         # Maximum search results to return
     MAX_HISTORY: int = 2         # Number of conversation messages to remember
     
+    # Response cache settings
+    RESPONSE_CACHE_SIZE: int = 256            # Cached answers kept for standalone queries
+    RESPONSE_CACHE_SIMILARITY: float = 0.95   # Cosine similarity for a semantic cache hit
+    
+    # Search result cache settings
+    SEARCH_CACHE_SIZE: int = 256      # Vector search results kept per store
+    SEARCH_CACHE_TTL: float = 300.0   # Seconds before a cached search result expires
+    
     # Database paths
     CHROMA_PATH: str = "./chroma_db"  # ChromaDB storage location
 
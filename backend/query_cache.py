@@ -0,0 +1,61 @@
+from collections import OrderedDict
+from typing import Any, Callable, Dict, Hashable, Optional, Tuple
+import threading
+import time
+
+class QueryCache:
+    """
+    Thread-safe LRU of vector search results with a time-to-live.
+    
+    Entries older than ttl seconds are treated as misses and dropped on access.
+    Callers invalidate the cache whenever the underlying collections change.
+    """
+    
+    def __init__(self, max_entries: int = 256, ttl: float = 300.0,
+                 clock: Callable[[], float] = time.monotonic):
+        self.max_entries = max_entries
+        self.ttl = ttl
+        self._clock = clock
+        self._lock = threading.RLock()
+        # key -> (stored at, value)
+        self._entries: "OrderedDict[Hashable, Tuple[float, Any]]" = OrderedDict()
+        self._hits = 0
+        self._misses = 0
+    
+    def get(self, key: Hashable) -> Optional[Any]:
+        """Return the cached value for key, or None on a miss or expired entry"""
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None and self._clock() - entry[0] <= self.ttl:
+                self._entries.move_to_end(key)
+                self._hits += 1
+                return entry[1]
+            
+            if entry is not None:
+                del self._entries[key]
+            self._misses += 1
+            return None
+    
+    def put(self, key: Hashable, value: Any):
+        """Cache value under key, evicting the least recently used entry when full"""
+        with self._lock:
+            self._entries[key] = (self._clock(), value)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+    
+    def invalidate(self):
+        """Drop every cached entry, e.g. after documents are added or removed"""
+        with self._lock:
+            self._entries.clear()
+    
+    def get_stats(self) -> Dict[str, Any]:
+        """Hit and miss counts since creation, with the resulting hit rate"""
+        with self._lock:
+            lookups = self._hits + self._misses
+            return {
+                "hits": self._hits,
+                "misses": self._misses,
+                "hit_rate": self._hits / lookups if lookups else 0.0,
+                "size": len(self._entries)
+            }
@@ -1,24 +1,43 @@
-from typing import List, Tuple, Optional, Dict
+from typing import List, Tuple, Optional, Dict, Any, AsyncIterator
 import os
+import asyncio
+from concurrent.futures import ThreadPoolExecutor
 from document_processor import DocumentProcessor
 from vector_store import VectorStore
-from ai_generator import AIGenerator
+from ai_generator import AIGenerator, FALLBACK_RESPONSE
 from session_manager import SessionManager
+from response_cache import ResponseCache
+from token_budget import get_encoding
 from search_tools import ToolManager, CourseSearchTool, CourseOutlineTool
 from models import Course, Lesson, CourseChunk
 
+# Upper bound on documents parsed at once during folder ingestion
+INGEST_WORKERS = 8
+
 class RAGSystem:
     """Main orchestrator for the Retrieval-Augmented Generation system"""
     
-    def __init__(self, config):
+    def __init__(self, config, vector_store: Optional[VectorStore] = None):
         self.config = config
         
-        # Initialize core components
+        # Initialize core components; a caller may share an already opened store
         self.document_processor = DocumentProcessor(config.CHUNK_SIZE, config.CHUNK_OVERLAP)
-        self.vector_store = VectorStore(config.CHROMA_PATH, config.EMBEDDING_MODEL, config.MAX_RESULTS)
-        self.ai_generator = AIGenerator(config.OPENAI_API_KEY, config.OPENAI_MODEL)
+        self.vector_store = vector_store or VectorStore(
+            config.CHROMA_PATH, config.EMBEDDING_MODEL, config.MAX_RESULTS,
+            cache_size=config.SEARCH_CACHE_SIZE, cache_ttl=config.SEARCH_CACHE_TTL
+        )
+        self.ai_generator = AIGenerator(
+            config.OPENAI_API_KEY, config.OPENAI_MODEL, small_model=config.OPENAI_SMALL_MODEL
+        )
         self.session_manager = SessionManager(config.MAX_HISTORY)
         
+        # Answers to standalone queries, reused for repeat and near-duplicate questions
+        self.response_cache = ResponseCache(
+            self.vector_store.embedding_function,
+            max_entries=config.RESPONSE_CACHE_SIZE,
+            similarity_threshold=config.RESPONSE_CACHE_SIMILARITY
+        )
+        
         # Initialize search tools
         self.tool_manager = ToolManager()
         self.search_tool = CourseSearchTool(self.vector_store)
@@ -46,6 +65,9 @@ class RAGSystem:
             # Add course content chunks to vector store
             self.vector_store.add_course_content(course_chunks)
             
+            # Cached answers may no longer reflect the course data
+            self.response_cache.clear()
+            
             return course, len(course_chunks)
         except Exception as e:
             print(f"Error processing course document {file_path}: {e}")
@@ -69,6 +91,7 @@ class RAGSystem:
         if clear_existing:
             print("Clearing existing data for fresh rebuild...")
             self.vector_store.clear_all_data()
+            self.response_cache.clear()
         
         if not os.path.exists(folder_path):
             print(f"Folder {folder_path} does not exist")
@@ -77,30 +100,58 @@ class RAGSystem:
         # Get existing course titles to avoid re-processing
         existing_course_titles = set(self.vector_store.get_existing_course_titles())
         
-        # Process each file in the folder
-        for file_name in os.listdir(folder_path):
-            file_path = os.path.join(folder_path, file_name)
-            if os.path.isfile(file_path) and file_name.lower().endswith(('.pdf', '.docx', '.txt')):
-                try:
-                    # Check if this course might already exist
-                    # We'll process the document to get the course ID, but only add if new
-                    course, course_chunks = self.document_processor.process_course_document(file_path)
-                    
-                    if course and course.title not in existing_course_titles:
-                        # This is a new course - add it to the vector store
-                        self.vector_store.add_course_metadata(course)
-                        self.vector_store.add_course_content(course_chunks)
-                        total_courses += 1
-                        total_chunks += len(course_chunks)
-                        print(f"Added new course: {course.title} ({len(course_chunks)} chunks)")
-                        existing_course_titles.add(course.title)
-                    elif course:
-                        print(f"Course already exists: {course.title} - skipping")
-                except Exception as e:
-                    print(f"Error processing {file_name}: {e}")
+        file_paths = [
+            os.path.join(folder_path, file_name)
+            for file_name in os.listdir(folder_path)
+            if os.path.isfile(os.path.join(folder_path, file_name))
+            and file_name.lower().endswith(('.pdf', '.docx', '.txt'))
+        ]
+        
+        # Parse documents concurrently so file reads overlap; results keep listing order
+        with ThreadPoolExecutor(max_workers=max(1, min(INGEST_WORKERS, len(file_paths)))) as pool:
+            parsed = list(pool.map(self._parse_course_file, file_paths))
+        
+        # Check each course against the catalog; only new ones are added
+        new_courses = []
+        new_chunks = []
+        for course, course_chunks in parsed:
+            if course and course.title not in existing_course_titles:
+                new_courses.append((course, len(course_chunks)))
+                new_chunks.extend(course_chunks)
+                existing_course_titles.add(course.title)
+            elif course:
+                print(f"Course already exists: {course.title} - skipping")
+        
+        # Embed and store every new course's chunks in one pass. Courses enter the
+        # catalog only after that succeeds, since cataloged courses are skipped on
+        # later runs and would otherwise stay without content
+        try:
+            self.vector_store.add_course_content(new_chunks)
+        except Exception as e:
+            print(f"Error adding course content: {e}")
+            new_courses = []
+        
+        for course, chunk_count in new_courses:
+            self.vector_store.add_course_metadata(course)
+            total_courses += 1
+            total_chunks += chunk_count
+            print(f"Added new course: {course.title} ({chunk_count} chunks)")
+        
+        # Cached answers may no longer reflect the course data, which a failed
+        # store may also have partly changed
+        if new_chunks:
+            self.response_cache.clear()
         
         return total_courses, total_chunks
     
+    def _parse_course_file(self, file_path: str) -> Tuple[Optional[Course], List[CourseChunk]]:
+        """Parse one course document, reporting failures instead of raising"""
+        try:
+            return self.document_processor.process_course_document(file_path)
+        except Exception as e:
+            print(f"Error processing {os.path.basename(file_path)}: {e}")
+            return None, []
+    
     def query(self, query: str, session_id: Optional[str] = None) -> Tuple[str, List[str]]:
         """
         Process a user query using the RAG system with tool-based search.
@@ -112,35 +163,153 @@ class RAGSystem:
         Returns:
             Tuple of (response, sources list - empty for tool-based approach)
         """
+        prompt, history = self._prepare_query(query, session_id)
+        
+        cached = self._cached_answer(query, session_id, history)
+        if cached is not None:
+            return cached
+        
+        # Generate response using AI with tools, collecting the sources this query's searches find
+        with self.tool_manager.collect_sources() as sources:
+            response = self.ai_generator.generate_response(
+                query=prompt,
+                conversation_history=history,
+                tools=self.tool_manager.get_tool_definitions(),
+                tool_manager=self.tool_manager,
+                user_query=query
+            )
+        
+        return self._complete_query(query, session_id, response, sources, history)
+    
+    async def aquery(self, query: str, session_id: Optional[str] = None) -> Tuple[str, List[str]]:
+        """
+        Async variant of query that awaits the AI generator, so callers on an
+        event loop never block it for the duration of the LLM calls.
+        """
+        prompt, history = self._prepare_query(query, session_id)
+        
+        # Embedding the query for the semantic lookup is CPU-bound, so keep it off the loop
+        cached = await asyncio.to_thread(self._cached_answer, query, session_id, history)
+        if cached is not None:
+            return cached
+        
+        # Generate response using AI with tools. Other queries run concurrently on the
+        # loop, so sources are collected for this query alone rather than read off the tools
+        with self.tool_manager.collect_sources() as sources:
+            response = await self.ai_generator.agenerate_response(
+                query=prompt,
+                conversation_history=history,
+                tools=self.tool_manager.get_tool_definitions(),
+                tool_manager=self.tool_manager,
+                user_query=query
+            )
+        
+        # Storing the answer embeds the query, so it too stays off the loop
+        return await asyncio.to_thread(self._complete_query, query, session_id, response, sources, history)
+    
+    async def aquery_stream(self, query: str, session_id: Optional[str] = None) -> AsyncIterator[Dict[str, Any]]:
+        """
+        Streaming variant of aquery.
+        
+        Yields {"token": text} events as the answer is generated, then a single
+        {"sources": [...]} event once the exchange has been recorded.
+        """
+        prompt, history = self._prepare_query(query, session_id)
+        
+        cached = await asyncio.to_thread(self._cached_answer, query, session_id, history)
+        if cached is not None:
+            yield {"token": cached[0]}
+            yield {"sources": cached[1]}
+            return
+        
+        parts = []
+        with self.tool_manager.collect_sources() as sources:
+            async for token in self.ai_generator.generate_response_stream(
+                query=prompt,
+                conversation_history=history,
+                tools=self.tool_manager.get_tool_definitions(),
+                tool_manager=self.tool_manager,
+                user_query=query
+            ):
+                parts.append(token)
+                yield {"token": token}
+        
+        _, sources = await asyncio.to_thread(self._complete_query, query, session_id, "".join(parts), sources, history)
+        yield {"sources": sources}
+    
+    def _prepare_query(self, query: str,
+                       session_id: Optional[str]) -> Tuple[str, Optional[List[Dict[str, str]]]]:
+        """Build the prompt and look up conversation history for a query"""
         # Create prompt for the AI with clear instructions
         prompt = f"""Answer this question about course materials: {query}"""
         
         # Get conversation history if session exists
         history = None
         if session_id:
-            history = self.session_manager.get_conversation_history(session_id)
-        
-        # Generate response using AI with tools
-        response = self.ai_generator.generate_response(
-            query=prompt,
-            conversation_history=history,
-            tools=self.tool_manager.get_tool_definitions(),
-            tool_manager=self.tool_manager
-        )
+            history = self.session_manager.get_history_messages(session_id)
         
-        # Get sources from the search tool
-        sources = self.tool_manager.get_last_sources()
-
-        # Reset sources after retrieving them
-        self.tool_manager.reset_sources()
+        return prompt, history
+    
+    def _cached_answer(self, query: str, session_id: Optional[str],
+                       history: Optional[List[Dict[str, str]]]) -> Optional[Tuple[str, List[str]]]:
+        """
+        Look up a cached answer for a standalone query, recording the exchange on a hit.
+        Queries with conversation history bypass the cache, since their answers
+        depend on context another session does not share.
+        """
+        if history:
+            return None
         
+        cached = self.response_cache.get(query)
+        if cached is not None and session_id:
+            self.session_manager.add_exchange(session_id, query, cached[0])
+        return cached
+    
+    def _complete_query(self, query: str, session_id: Optional[str], response: str, sources: List[Any],
+                        history: Optional[List[Dict[str, str]]] = None) -> Tuple[str, List[str]]:
+        """Record the exchange and cache the answer with the sources collected for this query"""
         # Update conversation history
         if session_id:
             self.session_manager.add_exchange(session_id, query, response)
         
+        # Only standalone queries are safe to answer from the cache later, and
+        # only with a real answer: a fallback may succeed on the next attempt
+        if not history and response.strip() and response != FALLBACK_RESPONSE:
+            self.response_cache.put(query, response, sources)
+        
         # Return response with sources from tool searches
         return response, sources
     
+    async def warm_up(self) -> List[str]:
+        """
+        Pay one-time initialization costs before the first query arrives: the
+        tokenizer's BPE load, the embedding model's weights, and the TLS connection
+        to OpenAI. Each step is best-effort so startup still succeeds offline.
+        
+        Returns:
+            Names of the steps that completed
+        """
+        steps = [
+            ("tokenizer", lambda: asyncio.to_thread(self._load_tokenizer)),
+            ("embedding model", lambda: asyncio.to_thread(self.vector_store.embedding_function, ["warmup"])),
+            ("OpenAI connection", self.ai_generator.warm_up),
+        ]
+        
+        warmed = []
+        for name, step in steps:
+            try:
+                await step()
+                warmed.append(name)
+            except Exception as e:
+                print(f"Warm-up of {name} skipped: {e}")
+        return warmed
+    
+    @staticmethod
+    def _load_tokenizer():
+        """Load the tokenizer, failing when only the character-count fallback is available"""
+        if get_encoding() is None:
+            raise RuntimeError("BPE file unavailable, tool budgets use character estimates")
+    
     def get_course_analytics(self) -> Dict:
         """Get analytics about the course catalog"""
         return {
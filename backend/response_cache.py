@@ -0,0 +1,126 @@
+from collections import OrderedDict
+from typing import Any, Callable, FrozenSet, List, Optional, Tuple
+import re
+import threading
+import numpy as np
+
+_WORD_PATTERN = re.compile(r"\w[\w'-]*")
+
+def _anchors(query: str) -> FrozenSet[str]:
+    """
+    Numbers and named entities in a query: words with a digit, or capitalized
+    past the first word. Queries differing only in these, such as two lesson
+    numbers, embed almost identically but need different answers.
+    """
+    return frozenset(
+        word.lower() for i, word in enumerate(_WORD_PATTERN.findall(query))
+        if any(c.isdigit() for c in word) or (i > 0 and word != word.lower())
+    )
+
+class ResponseCache:
+    """
+    Two-tier cache of answers for standalone queries.
+    
+    L1 matches the normalized query text exactly. L2 embeds the query and returns
+    the answer of the most similar cached query when their cosine similarity
+    reaches similarity_threshold and both mention the same numbers and named
+    entities. Both tiers share one LRU of max_entries.
+    
+    Lookups and stores run concurrently in worker threads, so all state is
+    guarded by one lock; embedding happens outside it.
+    """
+    
+    # Recent query embeddings kept so a miss followed by put() embeds once,
+    # even with other queries looked up in between
+    RECENT_EMBEDDINGS = 32
+    
+    def __init__(self, embedding_function: Callable[[List[str]], Any], max_entries: int = 256,
+                 similarity_threshold: float = 0.95):
+        self.embedding_function = embedding_function
+        self.max_entries = max_entries
+        self.similarity_threshold = similarity_threshold
+        
+        self._lock = threading.RLock()
+        # normalized query -> (answer, sources, unit embedding, anchors)
+        self._entries: "OrderedDict[str, Tuple[str, List[Any], np.ndarray, FrozenSet[str]]]" = OrderedDict()
+        # Stacked embeddings for L2, rebuilt lazily after the entries change
+        self._matrix: Optional[np.ndarray] = None
+        self._matrix_keys: List[str] = []
+        # Normalized query -> unit embedding, for the most recent lookups
+        self._recent: "OrderedDict[str, np.ndarray]" = OrderedDict()
+    
+    @staticmethod
+    def _normalize(query: str) -> str:
+        """Case- and whitespace-insensitive key for exact matching"""
+        return " ".join(query.lower().split())
+    
+    def _embed(self, key: str) -> np.ndarray:
+        """Unit-length embedding of a normalized query"""
+        with self._lock:
+            vector = self._recent.get(key)
+        if vector is not None:
+            return vector
+        
+        vector = np.asarray(self.embedding_function([key])[0], dtype=np.float32)
+        norm = np.linalg.norm(vector)
+        if norm:
+            vector = vector / norm
+        with self._lock:
+            self._recent[key] = vector
+            while len(self._recent) > self.RECENT_EMBEDDINGS:
+                self._recent.popitem(last=False)
+        return vector
+    
+    def get(self, query: str) -> Optional[Tuple[str, List[Any]]]:
+        """Return the cached (answer, sources) for query, or None on a miss"""
+        key = self._normalize(query)
+        
+        # L1: exact match
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None:
+                self._entries.move_to_end(key)
+                return entry[0], entry[1]
+            
+            if not self._entries:
+                return None
+        
+        vector = self._embed(key)
+        anchors = _anchors(query)
+        
+        # L2: most similar cached query above the threshold with the same anchors
+        with self._lock:
+            if not self._entries:
+                return None
+            if self._matrix is None:
+                self._matrix_keys = list(self._entries)
+                self._matrix = np.stack([self._entries[k][2] for k in self._matrix_keys])
+            similarities = self._matrix @ vector
+            
+            for index in np.argsort(-similarities):
+                if similarities[index] < self.similarity_threshold:
+                    return None
+                match = self._matrix_keys[index]
+                answer, sources, _, match_anchors = self._entries[match]
+                if match_anchors == anchors:
+                    self._entries.move_to_end(match)
+                    return answer, sources
+            return None
+    
+    def put(self, query: str, answer: str, sources: List[Any]):
+        """Cache the answer for query, evicting the least recently used entry when full"""
+        key = self._normalize(query)
+        entry = (answer, list(sources), self._embed(key), _anchors(query))
+        with self._lock:
+            self._entries[key] = entry
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+            self._matrix = None
+    
+    def clear(self):
+        """Drop every cached answer, e.g. after the course data changes"""
+        with self._lock:
+            self._entries.clear()
+            self._matrix = None
+            self._matrix_keys = []
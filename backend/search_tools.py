@@ -1,6 +1,27 @@
-from typing import Dict, Any, Optional, Protocol
+from typing import Dict, Any, List, Optional, Protocol, Iterator
 from abc import ABC, abstractmethod
+from contextlib import contextmanager
+from contextvars import ContextVar
+import orjson
 from vector_store import VectorStore, SearchResults
+from token_budget import truncate_to_tokens
+
+# Queries beyond this many characters are rejected before they reach the
+# embedding model, whose cost grows with input length
+MAX_QUERY_CHARS = 512
+QUERY_TOO_LONG = f"Query too long: keep searches under {MAX_QUERY_CHARS} characters."
+
+# Sources of the last search that found content, for the collection opened by
+# ToolManager.collect_sources in the current context. Tasks and worker threads
+# started inside that context share the collection; concurrent requests do not
+_collected_sources: ContextVar[Optional[List[Dict[str, Any]]]] = ContextVar("collected_sources", default=None)
+
+
+def record_sources(sources: List[Dict[str, Any]]):
+    """Make sources the current collection's sources; a no-op outside any collection"""
+    collected = _collected_sources.get()
+    if collected is not None:
+        collected[:] = sources
 
 
 class Tool(ABC):
@@ -8,7 +29,7 @@ class Tool(ABC):
     
     @abstractmethod
     def get_tool_definition(self) -> Dict[str, Any]:
-        """Return Anthropic tool definition for this tool"""
+        """Return OpenAI function tool definition for this tool"""
         pass
     
     @abstractmethod
@@ -25,27 +46,30 @@ class CourseSearchTool(Tool):
         self.last_sources = []  # Track sources from last search
     
     def get_tool_definition(self) -> Dict[str, Any]:
-        """Return Anthropic tool definition for this tool"""
+        """Return OpenAI function tool definition for this tool"""
         return {
-            "name": "search_course_content",
-            "description": "Search course materials with smart course name matching and lesson filtering",
-            "input_schema": {
-                "type": "object",
-                "properties": {
-                    "query": {
-                        "type": "string", 
-                        "description": "What to search for in the course content"
-                    },
-                    "course_name": {
-                        "type": "string",
-                        "description": "Course title (partial matches work, e.g. 'MCP', 'Introduction')"
+            "type": "function",
+            "function": {
+                "name": "search_course_content",
+                "description": "Search course materials with smart course name matching and lesson filtering",
+                "parameters": {
+                    "type": "object",
+                    "properties": {
+                        "query": {
+                            "type": "string", 
+                            "description": "What to search for in the course content"
+                        },
+                        "course_name": {
+                            "type": "string",
+                            "description": "Course title (partial matches work, e.g. 'MCP', 'Introduction')"
+                        },
+                        "lesson_number": {
+                            "type": "integer",
+                            "description": "Specific lesson number to search within (e.g. 1, 2, 3)"
+                        }
                     },
-                    "lesson_number": {
-                        "type": "integer",
-                        "description": "Specific lesson number to search within (e.g. 1, 2, 3)"
-                    }
-                },
-                "required": ["query"]
+                    "required": ["query"]
+                }
             }
         }
     
@@ -61,6 +85,8 @@ class CourseSearchTool(Tool):
         Returns:
             Formatted search results or error message
         """
+        if len(query) > MAX_QUERY_CHARS:
+            return QUERY_TOO_LONG
         
         # Use the vector store's unified search interface
         results = self.store.search(
@@ -69,6 +95,29 @@ class CourseSearchTool(Tool):
             lesson_number=lesson_number
         )
         
+        return self._render(results, course_name, lesson_number)
+    
+    def execute_batch(self, queries: List[Dict[str, Any]]) -> List[str]:
+        """
+        Execute several searches through one batched vector store call.
+        
+        Args:
+            queries: execute() keyword arguments, one dict per search
+            
+        Returns:
+            Formatted results or error messages, in input order; last_sources
+            holds the sources of the last search that found content
+        """
+        accepted = [q for q in queries if len(q["query"]) <= MAX_QUERY_CHARS]
+        results = iter(self.store.search_batch(accepted) if accepted else [])
+        return [
+            self._render(next(results), q.get("course_name"), q.get("lesson_number"))
+            if len(q["query"]) <= MAX_QUERY_CHARS else QUERY_TOO_LONG
+            for q in queries
+        ]
+    
+    def _render(self, results: SearchResults, course_name: Optional[str], lesson_number: Optional[int]) -> str:
+        """Turn search results into the tool's response text"""
         # Handle errors
         if results.error:
             return results.error
@@ -129,6 +178,7 @@ class CourseSearchTool(Tool):
         
         # Store sources for retrieval
         self.last_sources = sources
+        record_sources(sources)
         
         return "\n\n".join(formatted)
 
@@ -140,19 +190,22 @@ class CourseOutlineTool(Tool):
         self.store = vector_store
     
     def get_tool_definition(self) -> Dict[str, Any]:
-        """Return Anthropic tool definition for this tool"""
+        """Return OpenAI function tool definition for this tool"""
         return {
-            "name": "get_course_outline",
-            "description": "Get course outline including title, link, and complete lesson list",
-            "input_schema": {
-                "type": "object",
-                "properties": {
-                    "course_title": {
-                        "type": "string", 
-                        "description": "Course title to get outline for (partial matches work, e.g. 'MCP', 'Introduction')"
-                    }
-                },
-                "required": ["course_title"]
+            "type": "function",
+            "function": {
+                "name": "get_course_outline",
+                "description": "Get course outline including title, link, and complete lesson list",
+                "parameters": {
+                    "type": "object",
+                    "properties": {
+                        "course_title": {
+                            "type": "string", 
+                            "description": "Course title to get outline for (partial matches work, e.g. 'MCP', 'Introduction')"
+                        }
+                    },
+                    "required": ["course_title"]
+                }
             }
         }
     
@@ -166,7 +219,6 @@ class CourseOutlineTool(Tool):
         Returns:
             Formatted course outline or error message
         """
-        import json
         
         # Resolve course name using the same logic as CourseSearchTool
         resolved_title = self.store._resolve_course_name(course_title)
@@ -185,8 +237,8 @@ class CourseOutlineTool(Tool):
             
             # Parse lessons
             try:
-                lessons = json.loads(lessons_json)
-            except json.JSONDecodeError:
+                lessons = orjson.loads(lessons_json)
+            except orjson.JSONDecodeError:
                 lessons = []
             
             # Format the outline
@@ -219,14 +271,14 @@ class ToolManager:
     def register_tool(self, tool: Tool):
         """Register any tool that implements the Tool interface"""
         tool_def = tool.get_tool_definition()
-        tool_name = tool_def.get("name")
+        tool_name = tool_def.get("function", {}).get("name")
         if not tool_name:
-            raise ValueError("Tool must have a 'name' in its definition")
+            raise ValueError("Tool must have a 'function.name' in its definition")
         self.tools[tool_name] = tool
 
     
     def get_tool_definitions(self) -> list:
-        """Get all tool definitions for Anthropic tool calling"""
+        """Get all tool definitions for OpenAI function calling"""
         return [tool.get_tool_definition() for tool in self.tools.values()]
     
     def execute_tool(self, tool_name: str, **kwargs) -> str:
@@ -236,6 +288,10 @@ class ToolManager:
         
         return self.tools[tool_name].execute(**kwargs)
     
+    def execute_tool_bounded(self, tool_name: str, max_tokens: int = 1500, **kwargs) -> str:
+        """Execute a tool and cap its output at max_tokens, marking any truncation"""
+        return truncate_to_tokens(self.execute_tool(tool_name, **kwargs), max_tokens)
+    
     def get_last_sources(self) -> list:
         """Get sources from the last search operation"""
         # Check all tools for last_sources attribute
@@ -244,6 +300,29 @@ class ToolManager:
                 return tool.last_sources
         return []
 
+    @contextmanager
+    def collect_sources(self) -> Iterator[List[Dict[str, Any]]]:
+        """
+        Collect the sources found by tools run in the current context into a fresh
+        list. Unlike get_last_sources, the list belongs to the caller alone, so
+        concurrent queries sharing this manager never see each other's sources.
+        """
+        sources: List[Dict[str, Any]] = []
+        token = _collected_sources.set(sources)
+        try:
+            yield sources
+        finally:
+            try:
+                _collected_sources.reset(token)
+            except ValueError:
+                # Closed from another context, as when an abandoned streaming
+                # response is finalized; that context never held this collection
+                pass
+    
+    def record_sources(self, sources: List[Dict[str, Any]]):
+        """Make sources the current collection's sources, e.g. those of a winning speculative run"""
+        record_sources(sources)
+
     def reset_sources(self):
         """Reset sources from all tools that track sources"""
         for tool in self.tools.values():
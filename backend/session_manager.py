@@ -1,6 +1,11 @@
 from typing import Dict, List, Optional
 from dataclasses import dataclass
 
+# Extra exchanges a history may grow by before it is trimmed back to max_history.
+# Trimming drops the oldest turns and so changes the prompt prefix; doing it in
+# steps keeps the replayed history append-only, and cacheable, between trims
+HISTORY_TRIM_STEP = 4
+
 @dataclass
 class Message:
     """Represents a single message in a conversation"""
@@ -10,8 +15,9 @@ class Message:
 class SessionManager:
     """Manages conversation sessions and message history"""
     
-    def __init__(self, max_history: int = 5):
+    def __init__(self, max_history: int = 5, trim_step: int = HISTORY_TRIM_STEP):
         self.max_history = max_history
+        self.trim_step = trim_step
         self.sessions: Dict[str, List[Message]] = {}
         self.session_counter = 0
     
@@ -30,9 +36,11 @@ class SessionManager:
         message = Message(role=role, content=content)
         self.sessions[session_id].append(message)
         
-        # Keep conversation history within limits
-        if len(self.sessions[session_id]) > self.max_history * 2:
-            self.sessions[session_id] = self.sessions[session_id][-self.max_history * 2:]
+        # Keep conversation history within limits, trimming back to the last
+        # max_history exchanges (plus a pending user message) once the step is used up
+        messages = self.sessions[session_id]
+        if len(messages) > (self.max_history + self.trim_step) * 2:
+            self.sessions[session_id] = messages[-(self.max_history * 2 + len(messages) % 2):]
     
     def add_exchange(self, session_id: str, user_message: str, assistant_message: str):
         """Add a complete question-answer exchange"""
@@ -55,6 +63,17 @@ class SessionManager:
         
         return "\n".join(formatted_messages)
     
+    def get_history_messages(self, session_id: Optional[str]) -> Optional[List[Dict[str, str]]]:
+        """Get conversation history as role-tagged chat messages, oldest first"""
+        if not session_id or session_id not in self.sessions:
+            return None
+        
+        messages = self.sessions[session_id]
+        if not messages:
+            return None
+        
+        return [{"role": msg.role, "content": msg.content} for msg in messages]
+    
     def clear_session(self, session_id: str):
         """Clear all messages from a session"""
         if session_id in self.sessions:
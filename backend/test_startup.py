@@ -6,9 +6,6 @@ import sys
 import os
 import asyncio
 
-# Add current directory to path
-sys.path.append(os.path.dirname(os.path.abspath(__file__)))
-
 from rag_system import RAGSystem
 from config import config
 
@@ -0,0 +1,55 @@
+"""
+Shared pytest configuration; the backend directory is put on the path via pyproject.toml
+"""
+import pytest
+from unittest.mock import patch
+from test_fixtures import CachedSearchTool, OpenAITransport, TestRAGSystem, TestVectorStore
+
+from openai import DefaultAsyncHttpxClient
+from config import config
+from search_tools import CourseSearchTool
+
+@pytest.fixture(scope="session")
+def vector_store():
+    """Vector store shared by every read-only test in the session"""
+    try:
+        return TestVectorStore.shared_vector_store()
+    except Exception as e:
+        # Integration tests need ChromaDB and the embedding model available locally
+        pytest.skip(f"Vector store unavailable: {e}")
+
+@pytest.fixture(scope="session")
+def search_tool(vector_store):
+    """Course search tool over the shared store, memoizing results for the whole session"""
+    return CachedSearchTool(CourseSearchTool(vector_store))
+
+@pytest.fixture
+def fresh_search_tool(search_tool):
+    """The session search tool with its tracked sources cleared for this test"""
+    search_tool.last_sources = []
+    return search_tool
+
+@pytest.fixture(scope="session")
+def openai_transport():
+    """Canned OpenAI HTTP transport shared by the session's RAG system"""
+    return OpenAITransport()
+
+def build_rag_system(vector_store, openai_transport):
+    """RAG system over vector_store with a real OpenAI client on the canned transport"""
+    def http_client(**kwargs):
+        return DefaultAsyncHttpxClient(transport=openai_transport, **kwargs)
+    
+    # The client is created during construction, so the patches are only needed here
+    with patch.object(config, 'OPENAI_API_KEY', 'test-key'), \
+            patch('ai_generator.DefaultAsyncHttpxClient', http_client):
+        return TestRAGSystem.create_test_rag_system(vector_store)
+
+@pytest.fixture(scope="session")
+def shared_rag_system(vector_store, openai_transport):
+    """RAG system over the shared store, built once for the session"""
+    return build_rag_system(vector_store, openai_transport)
+
+@pytest.fixture
+def stub_rag_system(openai_transport):
+    """RAG system over the stub store, for query flows that need neither course data nor the embedding model"""
+    return build_rag_system(TestVectorStore.create_stub_vector_store(), openai_transport)
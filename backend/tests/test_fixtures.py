@@ -1,19 +1,26 @@
 """
 Test fixtures and utilities for RAG system testing
 """
-import sys
 import os
+import json
+import hashlib
+import sqlite3
+import threading
+import zlib
+from collections import namedtuple
+from functools import lru_cache
+from types import SimpleNamespace
 from unittest.mock import Mock, MagicMock
-from typing import Dict, List, Any
+from typing import Dict, List, Any, Iterable, Iterator, Mapping, Optional
 
-# Add the backend directory to the Python path so we can import modules
-sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+import httpx
+import numpy as np
+from chromadb import Documents, EmbeddingFunction, Embeddings
+from chromadb.utils import embedding_functions
 
 from config import config
 from vector_store import VectorStore, SearchResults
-from search_tools import CourseSearchTool, CourseOutlineTool, ToolManager
-from ai_generator import AIGenerator
-from rag_system import RAGSystem
+from search_tools import CourseSearchTool
 
 # Test data constants
 SAMPLE_COURSE_TITLES = [
@@ -32,17 +39,127 @@ SAMPLE_MCP_LESSONS = [
     {"lesson_number": 6, "lesson_title": "Connecting The MCP Chatbot To Reference Servers"}
 ]
 
+# Persistent embedding cache shared by test runs (gitignored)
+EMBED_CACHE_PATH = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), ".embed_cache")
+
+class CachedEmbeddingFn(EmbeddingFunction[Documents]):
+    """
+    Embedding function wrapper that keeps embeddings in an on-disk SQLite cache.
+    
+    Texts are keyed by a SHA-256 of the model name and text, so only texts never
+    seen before reach the wrapped model. Collection configuration is delegated
+    to the wrapped function so existing ChromaDB collections still match.
+    """
+    
+    def __init__(self, inner, cache_dir: str = EMBED_CACHE_PATH):
+        self.inner = inner
+        self._model_name = inner.get_config().get("model_name", "")
+        os.makedirs(cache_dir, exist_ok=True)
+        self._lock = threading.Lock()
+        # Parallel test workers share the file: WAL lets readers run alongside a writer,
+        # and the timeout makes a worker wait out another's commit instead of failing
+        self._db = sqlite3.connect(os.path.join(cache_dir, "embeddings.sqlite3"),
+                                   timeout=30.0, check_same_thread=False)
+        self._db.execute("PRAGMA journal_mode=WAL")
+        self._db.execute("CREATE TABLE IF NOT EXISTS embeddings (key TEXT PRIMARY KEY, vector BLOB)")
+    
+    def __call__(self, input: Documents) -> Embeddings:
+        keys = [hashlib.sha256(f"{self._model_name}\0{text}".encode()).hexdigest() for text in input]
+        with self._lock:
+            found = self._lookup(keys)
+            missing = {key: text for key, text in zip(keys, input) if key not in found}
+            if missing:
+                fresh = self.inner(list(missing.values()))
+                rows = [(key, np.asarray(vector, dtype=np.float32).tobytes()) for key, vector in zip(missing, fresh)]
+                self._db.executemany("INSERT OR REPLACE INTO embeddings VALUES (?, ?)", rows)
+                self._db.commit()
+                found.update((key, np.frombuffer(blob, dtype=np.float32)) for key, blob in rows)
+        return [found[key] for key in keys]
+    
+    def _lookup(self, keys: List[str]) -> Dict[str, np.ndarray]:
+        """Fetch the cached vectors for keys, leaving out the ones not stored yet"""
+        found = {}
+        unique = list(dict.fromkeys(keys))
+        # Stay under SQLite's bound parameter limit
+        for start in range(0, len(unique), 500):
+            chunk = unique[start:start + 500]
+            placeholders = ",".join("?" * len(chunk))
+            for key, blob in self._db.execute(
+                f"SELECT key, vector FROM embeddings WHERE key IN ({placeholders})", chunk
+            ):
+                found[key] = np.frombuffer(blob, dtype=np.float32)
+        return found
+    
+    def name(self) -> str:
+        return self.inner.name()
+    
+    def get_config(self) -> Dict[str, Any]:
+        return self.inner.get_config()
+    
+    def is_legacy(self) -> bool:
+        return self.inner.is_legacy()
+    
+    def default_space(self):
+        return self.inner.default_space()
+    
+    def supported_spaces(self):
+        return self.inner.supported_spaces()
+
+def hashed_embedding(texts: Documents) -> Embeddings:
+    """Deterministic bag-of-words stand-in for the sentence embedder, for stores that never load it"""
+    vectors = np.zeros((len(texts), 64), dtype=np.float32)
+    for row, text in enumerate(texts):
+        for word in text.lower().split():
+            vectors[row, zlib.crc32(word.encode()) % 64] += 1.0
+    return list(vectors)
+
 class TestVectorStore:
     """Test utilities for vector store operations"""
     
+    _EMB_FN = None
+    
+    @classmethod
+    def _get_embedding_fn(cls):
+        """Embedding function loaded once per process and shared by every test store"""
+        if cls._EMB_FN is None:
+            cls._EMB_FN = CachedEmbeddingFn(embedding_functions.SentenceTransformerEmbeddingFunction(
+                model_name=config.EMBEDDING_MODEL
+            ))
+        return cls._EMB_FN
+    
     @staticmethod
     def create_test_vector_store():
         """Create a vector store instance for testing"""
         return VectorStore(
             chroma_path=config.CHROMA_PATH,
             embedding_model=config.EMBEDDING_MODEL,
-            max_results=config.MAX_RESULTS
+            max_results=config.MAX_RESULTS,
+            embedding_function=TestVectorStore._get_embedding_fn()
+        )
+    
+    @staticmethod
+    @lru_cache(maxsize=1)
+    def shared_vector_store():
+        """Vector store built once and shared by read-only tests, so the embedding model loads once"""
+        store = TestVectorStore.create_test_vector_store()
+        # Pay the model's first-call initialization here rather than in the first search;
+        # through the embedding cache, later runs find the warmup text already stored
+        store.embedding_function(["warmup"])
+        return store
+    
+    @staticmethod
+    def create_stub_vector_store():
+        """Create a VectorStore stand-in returning one canned MCP lesson 5 hit for any search"""
+        stub = MagicMock(spec=VectorStore)
+        stub.search.return_value = SearchResults(
+            documents=["stub"],
+            metadata=[{"course_title": SAMPLE_COURSE_TITLES[1], "lesson_number": 5}],
+            distances=[0.1]
         )
+        stub.search_batch.side_effect = lambda queries, limit=None: [stub.search.return_value] * len(queries)
+        stub.get_lesson_link.return_value = "https://example.com/mcp/lesson-5"
+        stub.embedding_function = hashed_embedding
+        return stub
     
     @staticmethod
     def get_test_search_results(documents=None, metadata=None, distances=None):
@@ -53,53 +170,126 @@ class TestVectorStore:
             distances=distances or [0.5]
         )
 
+class CachedSearchTool:
+    """
+    CourseSearchTool wrapper that memoizes results by (query, course_name,
+    lesson_number), so tests repeating a search skip the ChromaDB round-trip.
+    Pass the same cache to several wrappers to share it across tests.
+    """
+    
+    def __init__(self, search_tool: CourseSearchTool, cache: Optional[Dict[tuple, tuple]] = None):
+        self._tool = search_tool
+        self._cache = {} if cache is None else cache
+        self.last_sources = []
+    
+    def get_tool_definition(self) -> Dict[str, Any]:
+        return self._tool.get_tool_definition()
+    
+    def execute(self, query: str, course_name: Optional[str] = None, lesson_number: Optional[int] = None) -> str:
+        key = (query, course_name, lesson_number)
+        if key not in self._cache:
+            self._tool.last_sources = []
+            result = self._tool.execute(query=query, course_name=course_name, lesson_number=lesson_number)
+            self._cache[key] = (result, self._tool.last_sources)
+        result, self.last_sources = self._cache[key]
+        return result
+
 class TestAIGenerator:
     """Test utilities for AI generator operations"""
     
     @staticmethod
     def create_mock_ai_generator():
         """Create a mock AI generator for testing"""
+        from ai_generator import AIGenerator
+        
         mock_generator = Mock(spec=AIGenerator)
         mock_generator.generate_response = Mock(return_value="Test response")
         return mock_generator
     
     @staticmethod
-    def create_mock_openai_response(tool_calls=None, content="Test response"):
-        """Create a mock OpenAI API response"""
-        mock_response = Mock()
-        mock_choice = Mock()
-        mock_message = Mock()
+    def create_mock_openai_client():
+        """Create an AsyncOpenAI stand-in; the spec rejects misspelled client attributes"""
+        from openai import AsyncOpenAI
         
-        mock_message.content = content
-        mock_message.tool_calls = tool_calls
-        mock_choice.message = mock_message
-        mock_response.choices = [mock_choice]
+        return MagicMock(spec=AsyncOpenAI)
+
+def make_response(content: str = "", tool_calls=None) -> SimpleNamespace:
+    """Create a read-only chat completion stub; far cheaper to build than a Mock tree"""
+    message = SimpleNamespace(content=content, tool_calls=tool_calls)
+    return SimpleNamespace(choices=[SimpleNamespace(message=message)])
+
+@lru_cache(maxsize=None)
+def _dump_arguments(items: tuple) -> str:
+    """Serialized tool arguments, reused by scenarios that repeat them"""
+    return json.dumps(dict(items))
+
+# Tool call leaves are only ever read, so plain tuples stand in for the SDK models
+ToolCallStub = namedtuple("ToolCallStub", "id type function")
+FunctionStub = namedtuple("FunctionStub", "name arguments")
+
+def make_tool_call(name: str, args: Mapping[str, Any], id: str = "c") -> ToolCallStub:
+    """Create a read-only function tool call stub"""
+    return ToolCallStub(id, "function", FunctionStub(name, _dump_arguments(tuple(args.items()))))
+
+def seq(*responses) -> Iterator:
+    """Responses for a mock to return one per call, in order"""
+    return iter(responses)
+
+def make_completion(content: str = "", tool_calls=None) -> Dict[str, Any]:
+    """Create a chat.completion JSON payload, with tool calls built by make_tool_call()"""
+    message = {"role": "assistant", "content": content or None}
+    if tool_calls:
+        message["tool_calls"] = [
+            {"id": call.id, "type": call.type, "function": call.function._asdict()} for call in tool_calls
+        ]
+    return {
+        "id": "chatcmpl-test",
+        "object": "chat.completion",
+        "created": 0,
+        "model": config.OPENAI_MODEL,
+        "choices": [{"index": 0, "message": message, "finish_reason": "tool_calls" if tool_calls else "stop"}]
+    }
+
+class OpenAITransport(httpx.AsyncBaseTransport):
+    """
+    httpx transport answering chat completion requests with canned payloads.
+    
+    A real AsyncOpenAI client built on it runs the SDK's request encoding and
+    response parsing offline. Request bodies are recorded for assertions.
+    """
+    
+    def __init__(self):
+        self.requests: List[Dict[str, Any]] = []
+        self._responses: Iterator = iter(())
+    
+    def respond_with(self, responses: Iterable[Dict[str, Any]]):
+        """Serve responses one per request, in order, forgetting earlier requests"""
+        self._responses = iter(responses)
+        self.requests = []
+    
+    async def handle_async_request(self, request: httpx.Request) -> httpx.Response:
+        if not request.url.path.endswith("/chat/completions"):
+            return httpx.Response(404, json={"error": {"message": f"{request.url.path} is not stubbed"}})
         
-        return mock_response
+        self.requests.append(json.loads(await request.aread()))
+        payload = next(self._responses, None)
+        if payload is None:
+            # A 4xx, since the SDK would retry a 5xx
+            return httpx.Response(400, json={"error": {"message": "No canned completion left"}})
+        return httpx.Response(200, json=payload)
+
+def titles_containing(titles: List[str], keyword: str) -> List[str]:
+    """Titles containing keyword, case-insensitively, found in one vectorized pass"""
+    titles_arr = np.array(titles, dtype=str)
+    mask = np.char.find(np.char.upper(titles_arr), keyword.upper()) >= 0
+    return titles_arr[mask].tolist()
 
 class TestRAGSystem:
     """Test utilities for RAG system operations"""
     
     @staticmethod
-    def create_test_rag_system():
-        """Create a RAG system instance for testing"""
-        return RAGSystem(config)
-
-def print_test_header(test_name: str):
-    """Print a formatted test header"""
-    print(f"\n{'='*60}")
-    print(f"TESTING: {test_name}")
-    print(f"{'='*60}")
-
-def print_test_result(test_name: str, passed: bool, details: str = ""):
-    """Print formatted test results"""
-    status = "PASS" if passed else "FAIL"
-    print(f"[{status}] {test_name}")
-    if details:
-        print(f"  Details: {details}")
-
-def print_section_header(section_name: str):
-    """Print a formatted section header"""
-    print(f"\n{'-'*40}")
-    print(f"{section_name}")
-    print(f"{'-'*40}")
\ No newline at end of file
+    def create_test_rag_system(vector_store=None):
+        """Create a RAG system instance for testing, over vector_store when one is given"""
+        from rag_system import RAGSystem
+        
+        return RAGSystem(config, vector_store=vector_store)
\ No newline at end of file
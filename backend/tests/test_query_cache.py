@@ -0,0 +1,61 @@
+"""
+Test QueryCache hits, LRU eviction and expiry
+"""
+from query_cache import QueryCache
+
+class FakeClock:
+    """Manually advanced stand-in for time.monotonic"""
+    
+    def __init__(self):
+        self.now = 0.0
+    
+    def __call__(self):
+        return self.now
+
+def test_query_cache_hits_and_misses():
+    """Test that stats count lookups and report the hit rate"""
+    cache = QueryCache(max_entries=4)
+    
+    assert cache.get(b"a") is None
+    cache.put(b"a", "results")
+    assert cache.get(b"a") == "results"
+    
+    assert cache.get_stats() == {"hits": 1, "misses": 1, "hit_rate": 0.5, "size": 1}
+
+def test_query_cache_evicts_least_recently_used():
+    """Test that a full cache drops the entry used longest ago"""
+    cache = QueryCache(max_entries=2)
+    cache.put("a", 1)
+    cache.put("b", 2)
+    
+    # Touching "a" leaves "b" as the eviction candidate
+    cache.get("a")
+    cache.put("c", 3)
+    
+    assert cache.get("b") is None
+    assert cache.get("a") == 1
+    assert cache.get("c") == 3
+
+def test_query_cache_expires_entries():
+    """Test that entries older than the TTL are misses"""
+    clock = FakeClock()
+    cache = QueryCache(ttl=10.0, clock=clock)
+    cache.put("a", 1)
+    
+    clock.now = 10.0
+    assert cache.get("a") == 1
+    
+    clock.now = 10.5
+    assert cache.get("a") is None
+    assert cache.get_stats()["size"] == 0
+
+def test_query_cache_invalidate():
+    """Test that invalidate empties the cache"""
+    cache = QueryCache()
+    cache.put("a", 1)
+    cache.put("b", 2)
+    
+    cache.invalidate()
+    
+    assert cache.get("a") is None
+    assert cache.get_stats()["size"] == 0
\ No newline at end of file
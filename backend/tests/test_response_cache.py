@@ -0,0 +1,62 @@
+"""
+Test ResponseCache exact and semantic lookups
+"""
+from response_cache import ResponseCache
+
+def keyword_embedding(texts):
+    """Deterministic stand-in for the sentence embedder: one axis per topic keyword"""
+    topics = ["mcp", "chroma", "retrieval"]
+    return [[float(topic in text) for topic in topics] + [0.1] for text in texts]
+
+def test_response_cache_exact_match():
+    """Test that a normalized repeat of a query hits without embedding it again"""
+    embed_calls = []
+    
+    def embedding_function(texts):
+        embed_calls.append(texts)
+        return keyword_embedding(texts)
+    
+    cache = ResponseCache(embedding_function, max_entries=4, similarity_threshold=0.95)
+    
+    assert cache.get("What is MCP?") is None
+    
+    cache.put("What is MCP?", "MCP is a protocol.", ["MCP Course - Lesson 1"])
+    
+    assert cache.get("  what is   MCP? ") == ("MCP is a protocol.", ["MCP Course - Lesson 1"])
+    assert len(embed_calls) == 1, "Exact hit should skip the embedder"
+
+def test_response_cache_semantic_match():
+    """Test that similar queries hit semantically and unrelated ones miss"""
+    cache = ResponseCache(keyword_embedding, max_entries=4, similarity_threshold=0.95)
+    cache.put("What is MCP?", "MCP is a protocol.", ["MCP Course - Lesson 1"])
+    
+    hit = cache.get("Tell me about MCP")
+    assert hit is not None and hit[0] == "MCP is a protocol.", hit
+    
+    assert cache.get("How does Chroma store vectors?") is None
+
+def test_response_cache_semantic_match_requires_same_anchors():
+    """Test that near-identical queries naming different lessons or courses miss"""
+    cache = ResponseCache(keyword_embedding, max_entries=4, similarity_threshold=0.95)
+    cache.put("What is in lesson 4 of the MCP course?", "Lesson 4 builds an MCP server.", [])
+    
+    assert cache.get("What is in lesson 5 of the MCP course?") is None
+    assert cache.get("What is in lesson 4 of the MCP Inspector course?") is None
+    
+    hit = cache.get("Tell me what is in lesson 4 of the MCP course")
+    assert hit is not None and hit[0] == "Lesson 4 builds an MCP server.", hit
+
+def test_response_cache_eviction_and_clear():
+    """Test LRU eviction and clearing"""
+    cache = ResponseCache(keyword_embedding, max_entries=2)
+    
+    cache.put("mcp basics", "A", [])
+    cache.put("chroma basics", "B", [])
+    cache.get("mcp basics")
+    cache.put("retrieval basics", "C", [])
+    
+    assert cache.get("chroma basics") is None, "Least recently used entry should be evicted"
+    assert cache.get("mcp basics") == ("A", [])
+    
+    cache.clear()
+    assert cache.get("retrieval basics") is None
\ No newline at end of file
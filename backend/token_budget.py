@@ -0,0 +1,40 @@
+import logging
+from functools import lru_cache
+from typing import Optional
+import tiktoken
+
+# Tokenizer shared by the gpt-4o and gpt-4.1 model families
+ENCODING_NAME = "o200k_base"
+
+# Approximate ratio for English text, used only when the tokenizer cannot be loaded
+FALLBACK_CHARS_PER_TOKEN = 4
+
+TRUNCATION_MARKER = "... [truncated]"
+
+@lru_cache(maxsize=1)
+def get_encoding() -> Optional[tiktoken.Encoding]:
+    """
+    Load the tokenizer once per process. Returns None when its BPE file cannot be
+    fetched (e.g. offline), so budgets fall back to a character estimate instead
+    of retrying the download on every call.
+    """
+    try:
+        return tiktoken.get_encoding(ENCODING_NAME)
+    except Exception as e:
+        logging.warning(f"Tokenizer '{ENCODING_NAME}' unavailable, using character budgets: {e}")
+        return None
+
+def truncate_to_tokens(text: str, max_tokens: int) -> str:
+    """Cap text at max_tokens, marking any truncation; text that fits is returned unchanged"""
+    encoding = get_encoding()
+    if encoding is None:
+        max_chars = max_tokens * FALLBACK_CHARS_PER_TOKEN
+        if len(text) <= max_chars:
+            return text
+        return text[:max_chars] + TRUNCATION_MARKER
+    
+    # Course text is plain data, so special-token strings are encoded as ordinary text
+    tokens = encoding.encode(text, disallowed_special=())
+    if len(tokens) <= max_tokens:
+        return text
+    return encoding.decode(tokens[:max_tokens]) + TRUNCATION_MARKER
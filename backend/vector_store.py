@@ -1,8 +1,11 @@
 import chromadb
 from chromadb.config import Settings
-from typing import List, Dict, Any, Optional
+from typing import List, Dict, Any, Iterator, Optional
 from dataclasses import dataclass
+import hashlib
+import orjson
 from models import Course, CourseChunk
+from query_cache import QueryCache
 from sentence_transformers import SentenceTransformer
 
 @dataclass
@@ -14,12 +17,12 @@ class SearchResults:
     error: Optional[str] = None
     
     @classmethod
-    def from_chroma(cls, chroma_results: Dict) -> 'SearchResults':
-        """Create SearchResults from ChromaDB query results"""
+    def from_chroma(cls, chroma_results: Dict, row: int = 0) -> 'SearchResults':
+        """Create SearchResults from one query row of ChromaDB query results"""
         return cls(
-            documents=chroma_results['documents'][0] if chroma_results['documents'] else [],
-            metadata=chroma_results['metadatas'][0] if chroma_results['metadatas'] else [],
-            distances=chroma_results['distances'][0] if chroma_results['distances'] else []
+            documents=chroma_results['documents'][row] if chroma_results['documents'] else [],
+            metadata=chroma_results['metadatas'][row] if chroma_results['metadatas'] else [],
+            distances=chroma_results['distances'][row] if chroma_results['distances'] else []
         )
     
     @classmethod
@@ -34,18 +37,23 @@ class SearchResults:
 class VectorStore:
     """Vector storage using ChromaDB for course content and metadata"""
     
-    def __init__(self, chroma_path: str, embedding_model: str, max_results: int = 5):
+    def __init__(self, chroma_path: str, embedding_model: str, max_results: int = 5,
+                 embedding_function=None, cache_size: int = 256, cache_ttl: float = 300.0):
         self.max_results = max_results
+        # Recent search results, reused for repeated queries until the data changes
+        self.query_cache = QueryCache(max_entries=cache_size, ttl=cache_ttl)
         # Initialize ChromaDB client
         self.client = chromadb.PersistentClient(
             path=chroma_path,
             settings=Settings(anonymized_telemetry=False)
         )
         
-        # Set up sentence transformer embedding function
-        self.embedding_function = chromadb.utils.embedding_functions.SentenceTransformerEmbeddingFunction(
-            model_name=embedding_model
-        )
+        # Set up sentence transformer embedding function, unless the caller shares
+        # an already loaded one between stores
+        self.embedding_function = embedding_function or \
+            chromadb.utils.embedding_functions.SentenceTransformerEmbeddingFunction(
+                model_name=embedding_model
+            )
         
         # Create collections for different types of data
         self.course_catalog = self._create_collection("course_catalog")  # Course titles/instructors
@@ -75,6 +83,14 @@ class VectorStore:
         Returns:
             SearchResults object with documents and metadata
         """
+        # Use provided limit or fall back to configured max_results
+        search_limit = limit if limit is not None else self.max_results
+        
+        key = self._cache_key(query, course_name, lesson_number, search_limit)
+        cached = self.query_cache.get(key)
+        if cached is not None:
+            return cached
+        
         # Step 1: Resolve course name if provided
         course_title = None
         if course_name:
@@ -86,18 +102,113 @@ class VectorStore:
         filter_dict = self._build_filter(course_title, lesson_number)
         
         # Step 3: Search course content
-        # Use provided limit or fall back to configured max_results
-        search_limit = limit if limit is not None else self.max_results
-        
         try:
             results = self.course_content.query(
                 query_texts=[query],
                 n_results=search_limit,
                 where=filter_dict
             )
-            return SearchResults.from_chroma(results)
         except Exception as e:
             return SearchResults.empty(f"Search error: {str(e)}")
+        
+        search_results = SearchResults.from_chroma(results)
+        self.query_cache.put(key, search_results)
+        return search_results
+    
+    def search_batch(self,
+                     queries: List[Dict[str, Any]],
+                     limit: Optional[int] = None) -> List[SearchResults]:
+        """
+        Run several searches at once, returning results in input order.
+        
+        Each query is a dict of search() arguments: "query" plus optional
+        "course_name" and "lesson_number". Course names are resolved in one
+        catalog query, all query texts are embedded in a single pass, and
+        queries sharing a filter go to ChromaDB as one multi-query call, so the
+        results match calling search() for each query. Queries already in the
+        query cache are answered from it.
+        """
+        search_limit = limit if limit is not None else self.max_results
+        results: List[Optional[SearchResults]] = [None] * len(queries)
+        
+        keys = [self._cache_key(q["query"], q.get("course_name"), q.get("lesson_number"), search_limit)
+                for q in queries]
+        misses = []
+        for i, key in enumerate(keys):
+            results[i] = self.query_cache.get(key)
+            if results[i] is None:
+                misses.append(i)
+        
+        course_names = list(dict.fromkeys(queries[i]["course_name"] for i in misses if queries[i].get("course_name")))
+        course_titles = self._resolve_course_names(course_names)
+        
+        # Group query positions by the (course_title, lesson_number) filter they share
+        groups: Dict[tuple, List[int]] = {}
+        for i in misses:
+            q = queries[i]
+            course_name = q.get("course_name")
+            course_title = course_titles.get(course_name) if course_name else None
+            if course_name and not course_title:
+                results[i] = SearchResults.empty(f"No course found matching '{course_name}'")
+                continue
+            groups.setdefault((course_title, q.get("lesson_number")), []).append(i)
+        
+        pending = [i for positions in groups.values() for i in positions]
+        if not pending:
+            return results
+        
+        try:
+            embeddings = dict(zip(pending, self.embedding_function([queries[i]["query"] for i in pending])))
+        except Exception as e:
+            for i in pending:
+                results[i] = SearchResults.empty(f"Search error: {str(e)}")
+            return results
+        
+        for (course_title, lesson_number), positions in groups.items():
+            try:
+                chroma_results = self.course_content.query(
+                    query_embeddings=[embeddings[i] for i in positions],
+                    n_results=search_limit,
+                    where=self._build_filter(course_title, lesson_number)
+                )
+                for row, i in enumerate(positions):
+                    results[i] = SearchResults.from_chroma(chroma_results, row)
+                    self.query_cache.put(keys[i], results[i])
+            except Exception as e:
+                for i in positions:
+                    results[i] = SearchResults.empty(f"Search error: {str(e)}")
+        
+        return results
+    
+    def _resolve_course_names(self, course_names: List[str]) -> Dict[str, str]:
+        """Resolve several course names to titles with one catalog query; unmatched names are left out"""
+        if not course_names:
+            return {}
+        
+        resolved = {}
+        try:
+            results = self.course_catalog.query(
+                query_texts=course_names,
+                n_results=1
+            )
+            
+            for name, documents, metadatas in zip(course_names, results['documents'], results['metadatas']):
+                if documents and metadatas:
+                    resolved[name] = metadatas[0]['title']
+        except Exception as e:
+            print(f"Error resolving course names: {e}")
+        
+        return resolved
+    
+    @staticmethod
+    def _cache_key(query: str, course_name: Optional[str], lesson_number: Optional[int], limit: int) -> bytes:
+        """Fixed-size query cache key for one set of search() arguments"""
+        raw = f"{query}|{course_name}|{lesson_number}|{limit}".encode()
+        return hashlib.blake2b(raw, digest_size=16).digest()
+    
+    def get_cache_stats(self) -> Dict[str, Any]:
+        """Hit and miss counts of the search result cache"""
+        return self.query_cache.get_stats()
     
     def _resolve_course_name(self, course_name: str) -> Optional[str]:
         """Use vector search to find best matching course by name"""
@@ -134,7 +245,6 @@ class VectorStore:
     
     def add_course_metadata(self, course: Course):
         """Add course information to the catalog for semantic search"""
-        import json
 
         course_text = course.title
         
@@ -153,11 +263,12 @@ class VectorStore:
                 "title": course.title,
                 "instructor": course.instructor,
                 "course_link": course.course_link,
-                "lessons_json": json.dumps(lessons_metadata),  # Serialize as JSON string
+                "lessons_json": orjson.dumps(lessons_metadata).decode(),  # Serialize as JSON string
                 "lesson_count": len(course.lessons)
             }],
             ids=[course.title]
         )
+        self.query_cache.invalidate()
     
     def add_course_content(self, chunks: List[CourseChunk]):
         """Add course content chunks to the vector store"""
@@ -173,11 +284,17 @@ class VectorStore:
         # Use title with chunk index for unique IDs
         ids = [f"{chunk.course_title.replace(' ', '_')}_{chunk.chunk_index}" for chunk in chunks]
         
-        self.course_content.add(
-            documents=documents,
-            metadatas=metadatas,
-            ids=ids
-        )
+        # Chunks from many courses go in as few add() calls as Chroma's batch cap allows,
+        # so the embedding model sees large batches instead of one course at a time
+        batch_size = self.client.get_max_batch_size()
+        for start in range(0, len(chunks), batch_size):
+            end = start + batch_size
+            self.course_content.add(
+                documents=documents[start:end],
+                metadatas=metadatas[start:end],
+                ids=ids[start:end]
+            )
+        self.query_cache.invalidate()
     
     def clear_all_data(self):
         """Clear all data from both collections"""
@@ -189,12 +306,32 @@ class VectorStore:
             self.course_content = self._create_collection("course_content")
         except Exception as e:
             print(f"Error clearing data: {e}")
+        self.query_cache.invalidate()
+    
+    def iter_lesson_chunks(self, course_title: str, lesson_number: Optional[int] = None,
+                           page_size: int = 256) -> Iterator[List[str]]:
+        """
+        Yield the content chunks of a course, or of one of its lessons, a page at a time.
+        
+        Only documents are fetched, page_size at a time, so memory stays bounded by
+        one page however many chunks match.
+        """
+        where = self._build_filter(course_title, lesson_number)
+        offset = 0
+        while True:
+            page = self.course_content.get(where=where, limit=page_size, offset=offset, include=['documents'])
+            documents = page['documents'] or []
+            if documents:
+                yield documents
+            if len(documents) < page_size:
+                return
+            offset += page_size
     
     def get_existing_course_titles(self) -> List[str]:
         """Get all existing course titles from the vector store"""
         try:
-            # Get all documents from the catalog
-            results = self.course_catalog.get()
+            # IDs are the titles, so skip loading documents and metadata
+            results = self.course_catalog.get(include=[])
             if results and 'ids' in results:
                 return results['ids']
             return []
@@ -205,26 +342,22 @@ class VectorStore:
     def get_course_count(self) -> int:
         """Get the total number of courses in the vector store"""
         try:
-            results = self.course_catalog.get()
-            if results and 'ids' in results:
-                return len(results['ids'])
-            return 0
+            return self.course_catalog.count()
         except Exception as e:
             print(f"Error getting course count: {e}")
             return 0
     
     def get_all_courses_metadata(self) -> List[Dict[str, Any]]:
         """Get metadata for all courses in the vector store"""
-        import json
         try:
-            results = self.course_catalog.get()
+            results = self.course_catalog.get(include=['metadatas'])
             if results and 'metadatas' in results:
                 # Parse lessons JSON for each course
                 parsed_metadata = []
                 for metadata in results['metadatas']:
                     course_meta = metadata.copy()
                     if 'lessons_json' in course_meta:
-                        course_meta['lessons'] = json.loads(course_meta['lessons_json'])
+                        course_meta['lessons'] = orjson.loads(course_meta['lessons_json'])
                         del course_meta['lessons_json']  # Remove the JSON string version
                     parsed_metadata.append(course_meta)
                 return parsed_metadata
@@ -248,7 +381,6 @@ class VectorStore:
     
     def get_lesson_link(self, course_title: str, lesson_number: int) -> Optional[str]:
         """Get lesson link for a given course title and lesson number"""
-        import json
         try:
             # Get course by ID (title is the ID)
             results = self.course_catalog.get(ids=[course_title])
@@ -256,7 +388,7 @@ class VectorStore:
                 metadata = results['metadatas'][0]
                 lessons_json = metadata.get('lessons_json')
                 if lessons_json:
-                    lessons = json.loads(lessons_json)
+                    lessons = orjson.loads(lessons_json)
                     # Find the lesson with matching number
                     for lesson in lessons:
                         if lesson.get('lesson_number') == lesson_number:
@@ -24,8 +24,8 @@ cd backend
 
 # Try uv first, fallback to direct python if uv not available
 if command -v uv >/dev/null 2>&1; then
-    uv run uvicorn app:app --reload --port 8000
+    uv run uvicorn app:app --reload --port 8000 --loop uvloop
 else
     echo "uv not found, using activated virtual environment..."
-    python -m uvicorn app:app --reload --port 8000
+    python -m uvicorn app:app --reload --port 8000 --loop uvloop
 fi
\ No newline at end of file